@@ -0,0 +1,137 @@
+# mojaNauka - benchmarki gorących ścieżek na syntetycznych taliach (bez wyświetlacza).
+# Użycie: python bench.py --sizes 1000 10000 100000 1000000 --output wyniki.json [--compare poprzednie.json]
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import silnik
+from silnik import FOLDER_PRZEDMIOTOW, MAGAZYNY, OCENY, StatusKarty, Karta, Harmonogram, zastosuj_ocene, sciezka_postepu, utworz_magazyn, wpis_historii, utworz_planiste
+
+try:
+    from main import APP_VERSION, IndeksWyszukiwania  # main.py importuje tkinter, ale nie otwiera okna
+except ImportError:
+    APP_VERSION, IndeksWyszukiwania = None, None
+
+DZIEN = 86400.0
+SLOWA = ("definicja", "twierdzenie", "algorytm", "złożoność", "przykład", "różnica", "zastosowanie", "pojęcie", "model",
+         "funkcja", "zbiór", "relacja", "dowód", "własność", "struktura", "proces", "metoda", "żółw", "źródło", "łańcuch")
+
+def generuj_karty(liczba, rng, now):
+    # Rozkład jak w używanej talii: ~40% nowych, ~10% w nauce (termin +-20 min), reszta w powtórkach
+    # z interwałem log-normalnym (mediana ~10 dni); ok. 1/6 powtórek jest już po terminie.
+    karty = []
+    for i in range(liczba):
+        pytanie = f"Pytanie {i}: {' '.join(rng.choice(SLOWA) for _ in range(rng.randint(3, 9)))}?"
+        los = rng.random()
+        if los < 0.4: karty.append(Karta(f"k{i}", pytanie, StatusKarty.NEW, now, 0.0))
+        elif los < 0.5:
+            interval = rng.choice((60.0, 600.0)); karty.append(Karta(f"k{i}", pytanie, StatusKarty.LEARNING, now + rng.uniform(-1200, 1200), interval))
+        else:
+            interval = min(rng.lognormvariate(math.log(10), 1.0), 3650) * DZIEN
+            karty.append(Karta(f"k{i}", pytanie, StatusKarty.REVIEW, now - rng.uniform(0, 1.2 * interval) + interval, interval))
+    return karty
+
+def zapisz_talie(deck_name, karty, backend):
+    with open(os.path.join(FOLDER_PRZEDMIOTOW, f"{deck_name}.txt"), 'w', encoding='utf-8') as f: f.writelines(k.pytanie + '\n' for k in karty)
+    with open(sciezka_postepu(deck_name), 'w', encoding='utf-8') as f: json.dump([k.do_json() for k in karty], f, ensure_ascii=False, indent=2)
+    if backend == 'binary':  # konwersja jak 'silnik.py --backend binary maintain' (zapisuje też plik .ids)
+        storage = utworz_magazyn(backend); storage.save_progress(deck_name, storage.load_cards(deck_name)); storage.close()
+
+def zmierz(fn, powtorzenia):
+    # Najlepszy z kilku pomiarów - najmniej zaszumiony; wynik ostatniego wywołania zwracany do dalszych kroków.
+    najlepszy = math.inf; wynik = None
+    for _ in range(powtorzenia):
+        start = time.perf_counter(); wynik = fn(); najlepszy = min(najlepszy, time.perf_counter() - start)
+    return najlepszy, wynik
+
+def benchmark_talii(backend, deck_name, liczba, args):
+    wyniki = {}; powtorzenia = args.repeat if liczba < 100_000 else 1
+    def zapisz(nazwa, sekundy, operacji=1): wyniki[nazwa] = {'seconds': sekundy, 'per_op': sekundy / operacji, 'ops': operacji}
+    start = time.perf_counter(); storage = utworz_magazyn(backend); zapisz('open_storage', time.perf_counter() - start)
+    try:
+        # StudyScreen.indeksuj_karty + rozpocznij_sesje (indeks id -> karta, harmonogram).
+        t, karty = zmierz(lambda: storage.load_session_cards(deck_name), powtorzenia); zapisz('load_session_cards', t)
+        def start_sesji():
+            karty_po_id = {k.id: k for k in karty}
+            return Harmonogram(karty)
+        t, harmonogram = zmierz(start_sesji, powtorzenia); zapisz('start_session', t)
+        # StudyScreen.ocen_karte: ocena, powrót do kopca, wpis historii i dopisanie do dziennika / UPDATE w SQLite.
+        rng = random.Random(args.seed); ocen = min(liczba, args.grades); start = time.perf_counter(); ocenione = 0
+        for _ in range(ocen):
+            karta = harmonogram.nastepna()
+            if karta is None: break
+            now = time.time(); ocena = rng.choice(OCENY); przed = (karta.status, karta.interval)
+            zastosuj_ocene(karta, ocena, now); harmonogram.dodaj(karta, now); storage.record_history(deck_name, wpis_historii(ocena, przed, karta, now))
+            if storage.record_review(deck_name, Karta(*karta.stan())): storage.save_progress(deck_name, karty)
+            ocenione += 1
+        zapisz('grade_card', time.perf_counter() - start, max(ocenione, 1))
+        # StudyScreen.zapisz_postep: czas w wątku wywołującym i do końca zapisu snapshotu w tle.
+        start = time.perf_counter(); storage.save_progress(deck_name, karty); zapisz('save_progress', time.perf_counter() - start)
+        silnik.DziennikPostepu.poczekaj(deck_name); zapisz('save_progress_complete', time.perf_counter() - start)
+        # WelcomeScreen: podsumowanie na zimno (bez cache) i z cache.
+        def podsumowanie_zimne():
+            if hasattr(storage, 'summary_cache'): storage.summary_cache.invalidate(deck_name)
+            return storage.summary(deck_name)
+        zapisz('summary_cold', zmierz(podsumowanie_zimne, powtorzenia)[0]); zapisz('summary_cached', zmierz(lambda: storage.summary(deck_name), powtorzenia)[0])
+        # BrowseScreen.on_show: wczytanie, sortowanie i budowa indeksu wyszukiwania.
+        def przegladanie():
+            karty_przegladu = sorted(storage.browse_cards(deck_name), key=lambda x: x.pytanie)
+            if IndeksWyszukiwania is not None:
+                indeks = IndeksWyszukiwania()
+                for i, k in enumerate(karty_przegladu): indeks.dodaj(i, k.pytanie)
+            return karty_przegladu
+        zapisz('browse', zmierz(przegladanie, powtorzenia)[0])
+        # StatsScreen: prognoza powtórek, histogram interwałów i skuteczność z historii ocen.
+        zapisz('analytics', zmierz(lambda: storage.analytics(deck_name), powtorzenia)[0])
+        # Ustawienia -> zmiana algorytmu: przeliczenie terminów całej talii (FSRS, jeden przebieg na kolumnach). Ostatnie - zmienia postęp.
+        planista = utworz_planiste('fsrs'); start = time.perf_counter(); przeliczone = storage.reschedule(deck_name, planista)
+        silnik.DziennikPostepu.poczekaj(deck_name); zapisz('reschedule', time.perf_counter() - start, max(przeliczone, 1))
+    finally: storage.close()
+    return wyniki
+
+def porownaj(wyniki, sciezka):
+    with open(sciezka, 'r', encoding='utf-8') as f: poprzednie = {(r['backend'], r['size'], r['operation']): r['seconds'] for r in json.load(f)['results']}
+    print(f"\nPorównanie z {sciezka} (>1.00 = wolniej niż poprzednio):")
+    for r in wyniki:
+        stary = poprzednie.get((r['backend'], r['size'], r['operation']))
+        if stary: print(f"  {r['backend']:<7} {r['size']:>8} {r['operation']:<24} {r['seconds'] / stary:6.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarki mojaNauka na syntetycznych taliach.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="liczby kart w taliach (np. 1000 ... 1000000)")
+    parser.add_argument('--backends', nargs='+', choices=MAGAZYNY, default=list(MAGAZYNY))
+    parser.add_argument('--grades', type=int, default=1000, help="liczba ocen w pomiarze grade_card")
+    parser.add_argument('--repeat', type=int, default=3, help="powtórzenia pomiaru (dla talii < 100k kart)")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help="plik JSON z wynikami"); parser.add_argument('--compare', help="poprzedni plik JSON do porównania")
+    args = parser.parse_args(argv)
+    katalog_startowy = os.getcwd(); wyniki = []
+    for liczba in args.sizes:
+        for backend in args.backends:
+            katalog = tempfile.mkdtemp(prefix='mojanauka-bench-'); os.chdir(katalog)
+            try:
+                os.makedirs(FOLDER_PRZEDMIOTOW); deck_name = f"bench_{liczba}"
+                start = time.perf_counter(); zapisz_talie(deck_name, generuj_karty(liczba, random.Random(args.seed), time.time()), backend); generowanie = time.perf_counter() - start
+                for operacja, pomiar in benchmark_talii(backend, deck_name, liczba, args).items():
+                    wyniki.append({'backend': backend, 'size': liczba, 'operation': operacja, **pomiar})
+                    print(f"{backend:<7} {liczba:>8} {operacja:<24} {pomiar['seconds'] * 1000:10.2f} ms  ({pomiar['per_op'] * 1e6:9.1f} µs/op)")
+                print(f"{backend:<7} {liczba:>8} {'(generowanie talii)':<24} {generowanie * 1000:10.2f} ms")
+            finally: os.chdir(katalog_startowy); shutil.rmtree(katalog, ignore_errors=True)
+    raport = {'app_version': APP_VERSION, 'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'numpy': silnik.np is not None,
+              'platform': platform.platform(), 'search_index': IndeksWyszukiwania is not None, 'results': wyniki}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: json.dump(raport, f, ensure_ascii=False, indent=2)
+    if args.compare: porownaj(wyniki, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,39 @@
 # Wymaga: pip install pygame
 
 import tkinter as tk
-from tkinter import ttk, font, messagebox, simpledialog, Toplevel, Listbox
+from tkinter import ttk, font, messagebox, simpledialog, filedialog, Toplevel, Listbox
 import json
 import os
-import random
-import uuid
-import copy
-from datetime import datetime, timedelta
+import sys
+import importlib.util
+import time
+import queue
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from collections import deque, Counter, defaultdict
+from datetime import date
 import math
+import re
+import bisect
+from silnik import FOLDER_PRZEDMIOTOW, migruj_stary_postep, PLIK_BAZY, POLA_STANU_KARTY, StatusKarty, Karta, Harmonogram, zastosuj_ocene, importuj_strumieniowo, nowe_id, utworz_magazyn, wpis_historii, OCENA_COFNIETA, PRZEDZIALY_INTERWALOW, PLANISTY, utworz_planiste
 
-try:
-    import pygame
-    SOUND_ENABLED_BY_INSTALL = True
-except ImportError:
-    SOUND_ENABLED_BY_INSTALL = False
+# pygame importowany dopiero przy pierwszym dźwięku (SoundManager) - tu tylko sprawdzamy, czy jest zainstalowany.
+pygame = None
+SOUND_ENABLED_BY_INSTALL = importlib.util.find_spec('pygame') is not None
+CZAS_STARTU = time.perf_counter()
 
 APP_VERSION = "3.4.3"
-FOLDER_PRZEDMIOTOW = "decks"
-FOLDER_DZWIEKOW = "sounds"
-PLIK_POSTEPU_PREFIX = "progress_"
+FOLDER_DZWIEKOW = os.path.abspath("sounds")  # wspólne dla profili - katalog roboczy zmienia się przy przełączaniu
 PLIK_USTAWIEN = "settings.json"
+FOLDER_PROFILI = "profiles"
+PLIK_PROFILI = "profile.json"
+PROFIL_DOMYSLNY = "Domyślny"
+ZAPIS_TALII_OPOZNIENIE_MS = 1500
+IO_POLL_MS = 15
+NAZWY_DZWIEKOW = ('flip', 'correct', 'incorrect')
+PROFIL_ROZMIAR_BUFORA = 5000
+PRZEGLAD_ODSWIEZANIE_MS = 5000
 
 THEMES = {
     "Dark": {
@@ -36,16 +49,119 @@ THEMES = {
     }
 }
 
-SRS_INTERVALS = {
-    'again': timedelta(minutes=1), 'hard': timedelta(minutes=10),
-    'good_initial': timedelta(days=1), 'easy_initial': timedelta(days=4),
-    'good_factor': 2.5, 'easy_factor_bonus': 1.3
-}
-SRS_MATURITY_THRESHOLD = timedelta(days=21)
+HISTORIA_COFANIA_LIMIT = 100
+
+POLSKIE_ZNAKI = str.maketrans('ąćęłńóśźż', 'acelnoszz')
+WZORZEC_TOKENU = re.compile(r'\w+')
+
+def tokenizuj(tekst): return WZORZEC_TOKENU.findall(tekst.lower().translate(POLSKIE_ZNAKI))
+
+class IndeksWyszukiwania:
+    # Indeks odwrócony token -> id dokumentów, ze sprowadzaniem polskich znaków (ą -> a, ł -> l ...).
+    # Każde słowo zapytania dopasowywane jest jako prefiks, więc działa przy wpisywaniu na bieżąco.
+    def __init__(self): self.tokeny = defaultdict(set); self.dokumenty = {}; self.slownik = []; self.slownik_nieaktualny = False
+    def dodaj(self, doc_id, tekst):
+        tokeny = frozenset(tokenizuj(tekst)); self.dokumenty[doc_id] = tokeny; self.slownik_nieaktualny = True
+        for token in tokeny: self.tokeny[token].add(doc_id)
+    def usun(self, doc_id):
+        for token in self.dokumenty.pop(doc_id, ()):
+            ids = self.tokeny[token]; ids.discard(doc_id)
+            if not ids: del self.tokeny[token]; self.slownik_nieaktualny = True
+    def zmien(self, doc_id, tekst): self.usun(doc_id); self.dodaj(doc_id, tekst)
+    def pasuje(self, doc_id, zapytanie):
+        tokeny = self.dokumenty.get(doc_id, ())
+        return all(any(t.startswith(q) for t in tokeny) for q in tokenizuj(zapytanie))
+    def _pasujace(self, prefiks):
+        if self.slownik_nieaktualny: self.slownik = sorted(self.tokeny); self.slownik_nieaktualny = False
+        wynik = set(); i = bisect.bisect_left(self.slownik, prefiks)
+        while i < len(self.slownik) and self.slownik[i].startswith(prefiks): wynik |= self.tokeny[self.slownik[i]]; i += 1
+        return wynik
+    def szukaj(self, zapytanie):
+        # Zwraca zbiór id dokumentów zawierających wszystkie słowa zapytania (None dla pustego zapytania).
+        tokeny = tokenizuj(zapytanie)
+        if not tokeny: return None
+        wynik = None
+        for token in sorted(set(tokeny), key=len, reverse=True):
+            wynik = self._pasujace(token) if wynik is None else wynik & self._pasujace(token)
+            if not wynik: return set()
+        return wynik
+
+class Profiler:
+    # Tryb profilowania ('profiling_enabled' w settings.json): czasy operacji trafiają do bufora cyklicznego,
+    # widocznego na ukrytym ekranie diagnostyki (Ctrl+Shift+D) i zrzucanego do pliku JSON.
+    def __init__(self, aktywny=False, rozmiar=PROFIL_ROZMIAR_BUFORA):
+        self.aktywny = aktywny; self.bufor = deque(maxlen=rozmiar)
+    def zapisz(self, kategoria, nazwa, ms):
+        if self.aktywny: self.bufor.append((time.time(), kategoria, nazwa, ms))
+    @contextlib.contextmanager
+    def zmierz(self, kategoria, nazwa):
+        start = time.perf_counter()
+        try: yield
+        finally: self.zapisz(kategoria, nazwa, (time.perf_counter() - start) * 1000)
+    def opakuj(self, fn, kategoria, nazwa=None):
+        if not self.aktywny: return fn
+        nazwa = nazwa or getattr(fn, '__name__', type(fn).__name__)
+        def mierzona(*args, **kwargs):
+            with self.zmierz(kategoria, nazwa): return fn(*args, **kwargs)
+        return mierzona
+    def podlacz_after(self):
+        # Spóźnienie callbacków after() ponad zamówiony czas, dla wszystkich widżetów (after_idle też przechodzi przez after).
+        oryginalne_after = tk.Misc.after; profiler = self
+        def after(widget, ms, func=None, *args):
+            if func is None: return oryginalne_after(widget, ms)
+            zaplanowano = time.perf_counter(); oczekiwane = 0 if ms == 'idle' else ms
+            def wywolaj(*a):
+                profiler.zapisz('after', getattr(func, '__qualname__', type(func).__name__), max(0.0, (time.perf_counter() - zaplanowano) * 1000 - oczekiwane))
+                return func(*a)
+            return oryginalne_after(widget, ms, wywolaj, *args)
+        tk.Misc.after = after
+    def statystyki(self):
+        grupy = defaultdict(list)
+        for _, kategoria, nazwa, ms in list(self.bufor): grupy[(kategoria, nazwa)].append(ms)
+        wynik = []
+        for (kategoria, nazwa), czasy in sorted(grupy.items()):
+            czasy.sort(); n = len(czasy)
+            wynik.append({'kategoria': kategoria, 'nazwa': nazwa, 'liczba': n, 'srednia_ms': sum(czasy) / n, 'p50_ms': czasy[n // 2], 'p95_ms': czasy[min(n - 1, int(n * 0.95))], 'max_ms': czasy[-1]})
+        return wynik
+    def zrzuc(self, sciezka):
+        pomiary = [{'czas': czas, 'kategoria': kategoria, 'nazwa': nazwa, 'ms': ms} for czas, kategoria, nazwa, ms in list(self.bufor)]
+        with open(sciezka, 'w', encoding='utf-8') as f: json.dump({'wersja': APP_VERSION, 'statystyki': self.statystyki(), 'pomiary': pomiary}, f, ensure_ascii=False, indent=2)
+    def wyczysc(self): self.bufor.clear()
+
+class IOWorker:
+    # Jeden wątek roboczy dla wszystkich operacji dyskowych (kolejność zadań zachowana);
+    # wyniki wracają do wątku Tk przez kolejkę odpytywaną przez after(), tylko gdy coś jest w toku.
+    def __init__(self, root, profiler=None):
+        self.root = root; self.profiler = profiler or Profiler(); self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mojaNauka-io')
+        self.wyniki = queue.SimpleQueue(); self.oczekujace = 0; self.poll_id = None
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        self.oczekujace += 1
+        future = self.executor.submit(self.profiler.opakuj(fn, 'io'), *args)
+        future.add_done_callback(lambda f: self.wyniki.put((f, on_done, on_error)))
+        if self.poll_id is None: self.poll_id = self.root.after(IO_POLL_MS, self._odbierz)
+        return future
+    def _odbierz(self):
+        self.poll_id = None
+        while True:
+            try: future, on_done, on_error = self.wyniki.get_nowait()
+            except queue.Empty: break
+            self.oczekujace -= 1
+            # Wyjątek w callbacku (np. TclError na zniszczonym widżecie) nie może zatrzymać odbioru pozostałych wyników.
+            try:
+                if future.exception() is not None: (on_error or self._zglos_blad)(future.exception())
+                elif on_done: on_done(future.result())
+            except Exception as e: print(f"Błąd w obsłudze wyniku operacji dyskowej: {e}")
+        if self.oczekujace: self.poll_id = self.root.after(IO_POLL_MS, self._odbierz)
+    def _zglos_blad(self, exc): print(f"Błąd operacji dyskowej: {exc}")
+    def gdy_bezczynny(self, fn):
+        # fn w wątku Tk, gdy wszystkie zgłoszone zadania już się zakończyły i ich wyniki zostały odebrane.
+        if self.oczekujace: self.root.after(IO_POLL_MS, lambda: self.gdy_bezczynny(fn))
+        else: fn()
+    def shutdown(self): self.executor.shutdown(wait=True)
 
 class SettingsManager:
     def __init__(self):
-        self.defaults = {'theme': 'Dark', 'sound_enabled': True, 'timer_duration': 0}
+        self.defaults = {'theme': 'Dark', 'sound_enabled': True, 'timer_duration': 0, 'new_cards_per_day': 0, 'new_card_spacing': 3, 'new_cards_today': {}, 'storage_backend': 'files', 'profiling_enabled': False, 'flip_animation': True, 'scheduler': 'classic', 'desired_retention': 0.9}
         self.settings = self.defaults.copy()
         self.load_settings()
     def load_settings(self):
@@ -57,49 +173,140 @@ class SettingsManager:
     def get(self, key): return self.settings.get(key, self.defaults.get(key))
     def set(self, key, value): self.settings[key] = value
 
+class ProfileManager:
+    # Profil = osobny katalog danych (settings.json, decks/, progress_*, baza SQLite): domyślny to katalog startowy,
+    # pozostałe leżą w profiles/<nazwa>/. Lista profili to tylko nazwy katalogów - talie i podsumowania wczytuje magazyn po przełączeniu.
+    def __init__(self):
+        self.katalog_bazowy = os.getcwd(); self.aktywny = PROFIL_DOMYSLNY
+        try:
+            with open(PLIK_PROFILI, 'r', encoding='utf-8') as f: nazwa = json.load(f).get('active')
+            if nazwa in self.lista(): self.aktywny = nazwa
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError): pass
+    def katalog(self, nazwa=None):
+        nazwa = nazwa or self.aktywny
+        return self.katalog_bazowy if nazwa == PROFIL_DOMYSLNY else os.path.join(self.katalog_bazowy, FOLDER_PROFILI, nazwa)
+    def lista(self):
+        folder = os.path.join(self.katalog_bazowy, FOLDER_PROFILI)
+        try: return [PROFIL_DOMYSLNY] + sorted(f.name for f in os.scandir(folder) if f.is_dir())
+        except FileNotFoundError: return [PROFIL_DOMYSLNY]
+    def utworz(self, nazwa):
+        nazwa = nazwa.strip()
+        if not nazwa or nazwa in ('.', '..') or any(znak in nazwa for znak in '/\\:*?"<>|'): raise ValueError(f"Niedozwolona nazwa profilu: '{nazwa}'.")
+        if nazwa in self.lista(): raise ValueError(f"Profil '{nazwa}' już istnieje.")
+        os.makedirs(os.path.join(self.katalog(nazwa), FOLDER_PRZEDMIOTOW)); return nazwa
+    def ustaw_aktywny(self, nazwa):
+        self.aktywny = nazwa
+        with open(os.path.join(self.katalog_bazowy, PLIK_PROFILI), 'w', encoding='utf-8') as f: json.dump({'active': nazwa}, f, ensure_ascii=False, indent=2)
+
 class SoundManager:
+    # Mikser startuje przy pierwszym play(); import pygame i dekodowanie plików odbywa się w wątku w tle,
+    # a dźwięk zgłoszony w trakcie ładowania jest odtwarzany zaraz po nim.
     def __init__(self, settings_manager):
-        self.settings = settings_manager
-        if not SOUND_ENABLED_BY_INSTALL: self.sounds = {}; return
+        self.settings = settings_manager; self.sounds = {}; self.ladowanie = None; self.oczekujacy = None
+    def uruchom(self):
+        if self.ladowanie is None and SOUND_ENABLED_BY_INSTALL:
+            self.ladowanie = threading.Thread(target=self._zaladuj, name='mojaNauka-dzwieki', daemon=True); self.ladowanie.start()
+    def _zaladuj(self):
+        global pygame
         try:
-            pygame.mixer.init()
-            self.sounds = {'flip': self.load_sound('flip'), 'correct': self.load_sound('correct'), 'incorrect': self.load_sound('incorrect')}
+            import pygame
+            pygame.mixer.init(); self.sounds = {name: self.load_sound(name) for name in NAZWY_DZWIEKOW}
         except Exception as e:
-            print(f"Błąd inicjalizacji dźwięku: {e}"); self.sounds = {}
+            print(f"Błąd inicjalizacji dźwięku: {e}"); return
+        if self.oczekujacy and self.sounds.get(self.oczekujacy): self.sounds[self.oczekujacy].play()
+        self.oczekujacy = None
     def load_sound(self, name):
         for ext in ['.wav', '.ogg']:
             path = os.path.join(FOLDER_DZWIEKOW, f"{name}{ext}")
             if os.path.exists(path): return pygame.mixer.Sound(path)
         return None
     def play(self, sound_name):
-        if SOUND_ENABLED_BY_INSTALL and self.settings.get('sound_enabled') and self.sounds.get(sound_name): self.sounds[sound_name].play()
+        if not (SOUND_ENABLED_BY_INSTALL and self.settings.get('sound_enabled')): return
+        if self.ladowanie is None or self.ladowanie.is_alive(): self.oczekujacy = sound_name; self.uruchom(); return
+        if self.sounds.get(sound_name): self.sounds[sound_name].play()
 
 class mojaNaukaApp(tk.Tk):
+    EKRANY = {}  # nazwa -> klasa ekranu, uzupełniane pod definicjami ekranów
     def __init__(self):
         super().__init__()
+        self.czasy_startu = [('import modułu', CZAS_STARTU)] if '--startup-timing' in sys.argv else None
+        self.profile = ProfileManager(); os.chdir(self.profile.katalog())
         self.settings = SettingsManager()
+        self.profiler = Profiler(bool(self.settings.get('profiling_enabled')))
+        if self.profiler.aktywny: self.profiler.podlacz_after()
         self.sound_manager = SoundManager(self.settings)
         os.makedirs(FOLDER_PRZEDMIOTOW, exist_ok=True); os.makedirs(FOLDER_DZWIEKOW, exist_ok=True)
+        self.storage = utworz_magazyn(self.settings.get('storage_backend'))
+        self.planista = utworz_planiste(self.settings.get('scheduler'), self.settings.get('desired_retention'))
+        self.io = IOWorker(self, self.profiler); self.io.submit(migruj_stary_postep, self.storage); self.znacznik_startu('ustawienia i magazyn')
         self.title(f"mojaNauka {APP_VERSION}"); self.geometry("950x700"); self.resizable(False, False)
         self.protocol("WM_DELETE_WINDOW", self.przy_zamykaniu)
+        self.bind('<Control-Shift-D>', lambda e: self.show_frame('DiagnosticsScreen', type(self.current_frame).__name__))
         self.theme = THEMES[self.settings.get('theme')]
         self.konfiguruj_style()
         self.configure(bg=self.theme['bg'])
-        container = ttk.Frame(self, style='TFrame'); container.pack(side="top", fill="both", expand=True)
-        container.grid_rowconfigure(0, weight=1); container.grid_columnconfigure(0, weight=1)
+        self.container = ttk.Frame(self, style='TFrame'); self.container.pack(side="top", fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1); self.container.grid_columnconfigure(0, weight=1)
+        self.znacznik_startu('okno i style')
+        # Ekrany budowane są przy pierwszym wyświetleniu - na starcie powstaje tylko ekran powitalny.
         self.frames = {}
-        for F in (WelcomeScreen, StudyScreen, DeckEditor, StatsScreen, BrowseScreen, SettingsScreen):
-            page_name = F.__name__
-            frame = F(parent=container, controller=self)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
-        self.show_frame("WelcomeScreen")
+        self.show_frame("WelcomeScreen"); self.znacznik_startu('ekran powitalny')
+        if self.czasy_startu is not None: self.after_idle(self.raport_startu)
+
+    def ekran(self, page_name):
+        if page_name not in self.frames:
+            start = time.perf_counter()
+            frame = self.EKRANY[page_name](parent=self.container, controller=self)
+            frame.grid(row=0, column=0, sticky="nsew"); self.frames[page_name] = frame
+            if self.czasy_startu is not None: print(f"[start] {page_name} zbudowany w {(time.perf_counter() - start) * 1000:.1f} ms")
+        return self.frames[page_name]
+
+    def znacznik_startu(self, etap):
+        if self.czasy_startu is not None: self.czasy_startu.append((etap, time.perf_counter()))
+    def raport_startu(self):
+        self.update_idletasks(); self.znacznik_startu('pierwsze rysowanie')
+        print("[start] Czas uruchomienia:")
+        for (_, poprzedni), (etap, czas) in zip(self.czasy_startu, self.czasy_startu[1:]): print(f"[start]   {etap:<22} {(czas - poprzedni) * 1000:8.1f} ms")
+        print(f"[start]   {'razem':<22} {(self.czasy_startu[-1][1] - CZAS_STARTU) * 1000:8.1f} ms")
 
     def show_frame(self, page_name, *args):
-        frame = self.frames[page_name]
-        if hasattr(frame, 'on_show'): frame.on_show(*args)
-        frame.tkraise()
+        with self.profiler.zmierz('ekran', page_name):
+            frame = self.ekran(page_name); poprzednia = getattr(self, 'current_frame', None)
+            if poprzednia is not None and poprzednia is not frame and hasattr(poprzednia, 'on_hide'): poprzednia.on_hide()
+            if hasattr(frame, 'on_show'): frame.on_show(*args)
+            frame.tkraise(); self.current_frame = frame
     
+    def set_storage(self, backend_name):
+        if backend_name == self.settings.get('storage_backend'): return
+        self.io.submit(self.storage.close); self.settings.set('storage_backend', backend_name); self.storage = utworz_magazyn(backend_name)
+
+    def set_scheduler(self, nazwa, retencja):
+        # Zwraca True, gdy algorytm lub retencja się zmieniły (wtedy warto przeliczyć terminy talii).
+        if (nazwa, retencja) == (self.settings.get('scheduler'), self.settings.get('desired_retention')): return False
+        self.settings.set('scheduler', nazwa); self.settings.set('desired_retention', retencja); self.planista = utworz_planiste(nazwa, retencja); return True
+
+    def set_profile(self, nazwa, on_error=None):
+        # Katalog roboczy jest wspólny dla całego procesu: stary magazyn zamykamy w wątku I/O (czeka na zapisy snapshotów w tle),
+        # a chdir i nowy magazyn robimy w wątku Tk dopiero, gdy kolejka I/O jest pusta - nic nie pracuje wtedy na ścieżkach względnych.
+        if nazwa == self.profile.aktywny: return
+        self.zapisz_sesje(); self.settings.save_settings(); stary_katalog = os.getcwd()
+        def przelacz():
+            try:
+                os.chdir(self.profile.katalog(nazwa)); os.makedirs(FOLDER_PRZEDMIOTOW, exist_ok=True)
+                settings = SettingsManager(); storage = utworz_magazyn(settings.get('storage_backend'))
+            except Exception as e:
+                os.chdir(stary_katalog); przywroc(e); return
+            self.settings, self.storage = settings, storage; self.sound_manager.settings = settings; self.profile.ustaw_aktywny(nazwa)
+            self.planista = utworz_planiste(settings.get('scheduler'), settings.get('desired_retention'))
+            # Ekrany trzymają stan talii starego profilu - budujemy je od nowa przy pierwszym wyświetleniu.
+            for frame in self.frames.values(): frame.destroy()
+            self.io.submit(migruj_stary_postep, storage)
+            self.frames = {}; self.current_frame = None; self.set_theme(settings.get('theme')); self.show_frame("WelcomeScreen")
+        def przywroc(exc):
+            # Stary magazyn jest już (częściowo) zamknięty - otwieramy go na nowo w dotychczasowym katalogu.
+            self.storage = utworz_magazyn(self.settings.get('storage_backend')); (on_error or self.io._zglos_blad)(exc)
+        self.io.submit(self.storage.close, on_done=lambda _: self.io.gdy_bezczynny(przelacz), on_error=przywroc)
+
     def set_theme(self, theme_name):
         self.settings.set('theme', theme_name); self.theme = THEMES[theme_name]
         self.configure(bg=self.theme['bg']); self.konfiguruj_style()
@@ -115,7 +322,6 @@ class mojaNaukaApp(tk.Tk):
         style.configure('Title.TLabel', font=('Segoe UI Semibold', 24), foreground=self.theme['fg'])
         style.configure('Header.TLabel', font=('Segoe UI Semibold', 16), foreground=self.theme['fg'])
         style.configure('Subtitle.TLabel', font=('Segoe UI', 14), foreground=self.theme['secondary'])
-        style.configure('Question.TLabel', background=self.theme['frame_bg'], font=('Segoe UI Semibold', 24))
         style.configure('Card.Header.TLabel', background=self.theme['frame_bg'], font=('Segoe UI', 14, 'bold'))
         style.configure('Card.TLabel', background=self.theme['frame_bg'], foreground=self.theme['fg'])
         style.configure('TButton', font=('Segoe UI', 11, 'bold'), padding=12, relief='flat', background=self.theme['frame_bg'])
@@ -132,12 +338,17 @@ class mojaNaukaApp(tk.Tk):
         style.map('TCheckbutton', background=[('active', self.theme['frame_bg'])], indicatorcolor=[('selected', self.theme['highlight'])])
         style.configure('Card.TRadiobutton', background=self.theme['frame_bg'], foreground=self.theme['fg'])
         style.configure('Card.TCheckbutton', background=self.theme['frame_bg'], foreground=self.theme['fg'])
+        style.configure('Treeview', background=self.theme['frame_bg'], fieldbackground=self.theme['frame_bg'], foreground=self.theme['fg'])
+        style.configure('Treeview.Heading', background=self.theme['bg'], foreground=self.theme['fg'], font=('Segoe UI', 10, 'bold'))
 
-    def przy_zamykaniu(self):
-        self.settings.save_settings()
+    def zapisz_sesje(self):
+        if hasattr(getattr(self, 'current_frame', None), 'on_hide'): self.current_frame.on_hide()
         if 'StudyScreen' in self.frames and hasattr(self.frames['StudyScreen'], 'nazwa_przedmiotu') and self.frames['StudyScreen'].nazwa_przedmiotu:
              self.frames['StudyScreen'].zapisz_postep()
-        self.destroy()
+
+    def przy_zamykaniu(self):
+        self.settings.save_settings(); self.zapisz_sesje()
+        self.io.shutdown(); self.storage.close(); self.destroy()
 
 class WelcomeScreen(ttk.Frame):
     def __init__(self, parent, controller):
@@ -145,7 +356,14 @@ class WelcomeScreen(ttk.Frame):
         top_bar = ttk.Frame(self); top_bar.pack(fill='x', padx=10, pady=10, anchor='n')
         ttk.Label(top_bar, text="Witaj w mojaNauka!", style='Title.TLabel').pack(side='left', anchor='w')
         ttk.Button(top_bar, text="⚙️", command=lambda: controller.show_frame("SettingsScreen")).pack(side='right', anchor='e')
-        ttk.Label(self, text="Wybierz przedmiot, aby rozpocząć", style='Subtitle.TLabel').pack(pady=(0, 20))
+        # Przełącznik profili; lista katalogów profili odczytywana dopiero przy rozwinięciu.
+        ttk.Button(top_bar, text="➕", command=self.nowy_profil).pack(side='right', anchor='e', padx=(5, 10))
+        self.profil_var = tk.StringVar(value=controller.profile.aktywny)
+        self.profil_combo = ttk.Combobox(top_bar, textvariable=self.profil_var, values=[controller.profile.aktywny], state='readonly', width=16,
+                                         postcommand=lambda: self.profil_combo.config(values=controller.profile.lista()))
+        self.profil_combo.pack(side='right', anchor='e'); self.profil_combo.bind('<<ComboboxSelected>>', lambda e: self.przelacz_profil(self.profil_var.get()))
+        ttk.Label(top_bar, text="👤").pack(side='right', anchor='e', padx=5)
+        self.subtitle_label = ttk.Label(self, text="Wybierz przedmiot, aby rozpocząć", style='Subtitle.TLabel'); self.subtitle_label.pack(pady=(0, 20))
         list_frame = ttk.Frame(self, style='Card.TFrame', padding=10); list_frame.pack(pady=10, padx=50, fill='x')
         self.deck_listbox = Listbox(list_frame, font=('Segoe UI', 14), relief='flat', borderwidth=0, height=8, selectborderwidth=0, exportselection=False)
         self.deck_listbox.pack(pady=10, padx=10, fill="both", expand=True)
@@ -155,6 +373,7 @@ class WelcomeScreen(ttk.Frame):
         self.start_button = ttk.Button(main_btn_frame, text="🚀 Rozpocznij Naukę", style='Accent.TButton', state='disabled', command=self.start_session)
         self.start_button.pack(side='left', padx=10)
         ttk.Button(main_btn_frame, text="⚙️ Zarządzaj Przedmiotami", command=lambda: controller.show_frame("DeckEditor")).pack(side='left', padx=10)
+        ttk.Button(main_btn_frame, text="🗂️ Wszystkie Przedmioty", command=lambda: controller.show_frame("DashboardScreen")).pack(side='left', padx=10)
         self.context_btn_frame = ttk.Frame(btn_container, style='TFrame'); self.context_btn_frame.pack(pady=10)
         self.browse_button = ttk.Button(self.context_btn_frame, text="👁️ Przeglądaj", state='disabled', command=self.browse_deck)
         self.browse_button.pack(side='left', padx=10)
@@ -166,72 +385,65 @@ class WelcomeScreen(ttk.Frame):
         ttk.Label(self.stats_frame, text="Podsumowanie Przedmiotu", style='Card.Header.TLabel').pack(pady=(0, 15))
         self.stats_canvas = tk.Canvas(self.stats_frame, height=20, highlightthickness=0)
         self.stats_canvas.pack(fill='x')
-        self.legend_frame = ttk.Frame(self.stats_frame, style='Card.TFrame'); self.legend_frame.pack(pady=10)
+        # Pasek i legenda tworzone raz; wybór przedmiotu zmienia tylko współrzędne, teksty i widoczność.
+        self.pasek_do_nauki = self.stats_canvas.create_rectangle(0, 0, 0, 20, outline=""); self.pasek_nauczone = self.stats_canvas.create_rectangle(0, 0, 0, 20, outline="")
+        self.legend_frame = ttk.Frame(self.stats_frame, style='Card.TFrame'); self.legend_frame.pack(pady=10); self.legenda = {}
+        for klucz in ('do_nauki', 'nauczone'):
+            legend_item = ttk.Frame(self.legend_frame, style='Card.TFrame')
+            kropka = ttk.Label(legend_item, text="●", font=('Segoe UI', 14), style='Card.TLabel'); kropka.pack(side='left')
+            opis = ttk.Label(legend_item, style='Card.TLabel'); opis.pack(side='left', padx=5); self.legenda[klucz] = (legend_item, kropka, opis)
         self.update_theme()
     def update_theme(self):
         theme = self.controller.theme
         self.deck_listbox.config(bg=theme['frame_bg'], fg=theme['fg'], selectbackground=theme['highlight'])
         self.stats_canvas.config(bg=theme['frame_bg'])
+        for klucz, pasek, kolor in (('do_nauki', self.pasek_do_nauki, theme['danger']), ('nauczone', self.pasek_nauczone, theme['accent'])):
+            self.stats_canvas.itemconfig(pasek, fill=kolor); self.legenda[klucz][1].config(foreground=kolor)
         if self.deck_listbox.curselection(): self.on_deck_select()
     def on_show(self, *args):
-        self.deck_listbox.delete(0, 'end')
-        przedmioty = [f.replace('.txt', '') for f in os.listdir(FOLDER_PRZEDMIOTOW) if f.endswith('.txt')]
-        for przedmiot in przedmioty: self.deck_listbox.insert('end', przedmiot)
+        self.deck_listbox.delete(0, 'end'); self.subtitle_label.config(text="⏳ Wczytywanie przedmiotów...")
         self.start_button.config(state='disabled'); self.stats_button.config(state='disabled')
         self.reset_button.config(state='disabled'); self.browse_button.config(state='disabled')
         self.update_stats_display(None)
+        self.controller.io.submit(self.controller.storage.list_decks, on_done=self.pokaz_przedmioty)
+    def przelacz_profil(self, nazwa):
+        if nazwa == self.controller.profile.aktywny: return
+        self.profil_combo.config(state='disabled'); self.deck_listbox.delete(0, 'end'); self.update_stats_display(None)
+        self.subtitle_label.config(text=f"⏳ Przełączanie na profil '{nazwa}'..."); self.controller.set_profile(nazwa, on_error=self.blad_profilu)
+    def blad_profilu(self, exc):
+        # Zostajemy przy dotychczasowym profilu; magazyn został już odtworzony przez kontroler.
+        self.profil_var.set(self.controller.profile.aktywny); self.profil_combo.config(state='readonly'); self.on_show()
+        messagebox.showerror("Błąd", f"Nie udało się przełączyć profilu: {exc}")
+    def nowy_profil(self):
+        nazwa = simpledialog.askstring("Nowy profil", "Podaj nazwę profilu (osobne przedmioty, postęp i ustawienia):", parent=self)
+        if nazwa and nazwa.strip():
+            self.controller.io.submit(self.controller.profile.utworz, nazwa, on_done=self.przelacz_profil, on_error=lambda e: messagebox.showerror("Błąd", str(e)))
+    def pokaz_przedmioty(self, przedmioty):
+        self.deck_listbox.delete(0, 'end'); self.subtitle_label.config(text="Wybierz przedmiot, aby rozpocząć")
+        for przedmiot in przedmioty: self.deck_listbox.insert('end', przedmiot)
     def on_deck_select(self, event=None):
         if not self.deck_listbox.curselection(): return
         self.start_button.config(state='normal'); self.stats_button.config(state='normal')
         self.reset_button.config(state='normal'); self.browse_button.config(state='normal')
-        self.update_stats_display(self.get_deck_summary())
-    def get_deck_summary(self, deck_name=None):
-        if deck_name is None:
-            if not self.deck_listbox.curselection(): return {}
-            deck_name = self.deck_listbox.get(self.deck_listbox.curselection())
-        plik_postepu = f"{PLIK_POSTEPU_PREFIX}{deck_name}.json"
-        summary = {'new': 0, 'learning': 0, 'young': 0, 'mature': 0}
-        if not os.path.exists(plik_postepu):
-            plik_przedmiotu = os.path.join(FOLDER_PRZEDMIOTOW, f"{deck_name}.txt")
-            if os.path.exists(plik_przedmiotu):
-                with open(plik_przedmiotu, 'r', encoding='utf-8') as f: summary['new'] = len([line for line in f if line.strip()])
-        else:
-            with open(plik_postepu, 'r', encoding='utf-8') as f:
-                try: karty = json.load(f)
-                except json.JSONDecodeError: karty = []
-            now = datetime.now()
-            for k in karty:
-                if k.get('status') == 'new': summary['new'] += 1
-                elif datetime.fromisoformat(k.get('due_date', now.isoformat())) <= now: summary['learning'] += 1
-                else:
-                    interval = timedelta(seconds=k.get('interval', 0))
-                    if interval >= SRS_MATURITY_THRESHOLD: summary['mature'] += 1
-                    else: summary['young'] += 1
-        return summary
+        self.odswiez_podsumowanie()
+    def odswiez_podsumowanie(self):
+        deck_name = self.deck_listbox.get(self.deck_listbox.curselection()); self.wybrany_deck = deck_name
+        def pokaz(summary):
+            if self.wybrany_deck == deck_name: self.update_stats_display(summary)  # pomijamy wynik dla wcześniej klikniętej talii
+        self.controller.io.submit(self.controller.storage.summary, deck_name, on_done=pokaz)
     def update_stats_display(self, summary):
-        self.stats_canvas.delete("all");
-        for widget in self.legend_frame.winfo_children(): widget.destroy()
-        if not summary: return
+        summary = summary or {}
         do_nauki = summary.get('new', 0) + summary.get('learning', 0)
         nauczone = summary.get('young', 0) + summary.get('mature', 0)
-        total = do_nauki + nauczone
-        if total == 0: return
-        canvas_width = 850
-        nauka_width = (do_nauki / total) * canvas_width
-        self.stats_canvas.create_rectangle(0, 0, nauka_width, 20, fill=self.controller.theme['danger'], outline="")
-        nauczone_width = (nauczone / total) * canvas_width
-        self.stats_canvas.create_rectangle(nauka_width, 0, nauka_width + nauczone_width, 20, fill=self.controller.theme['accent'], outline="")
-        if do_nauki > 0:
-            legend_item = ttk.Frame(self.legend_frame, style='Card.TFrame'); legend_item.pack(side='left', padx=10)
-            ttk.Label(legend_item, text="●", foreground=self.controller.theme['danger'], font=('Segoe UI', 14), style='Card.TLabel').pack(side='left')
-            ttk.Label(legend_item, text=f"Nie nauczone: {do_nauki}", style='Card.TLabel').pack(side='left', padx=5)
-        if nauczone > 0:
-            legend_item2 = ttk.Frame(self.legend_frame, style='Card.TFrame'); legend_item2.pack(side='left', padx=10)
-            ttk.Label(legend_item2, text="●", foreground=self.controller.theme['accent'], font=('Segoe UI', 14), style='Card.TLabel').pack(side='left')
-            ttk.Label(legend_item2, text=f"Nauczone: {nauczone}", style='Card.TLabel').pack(side='left', padx=5)
+        total = do_nauki + nauczone; canvas_width = 850
+        nauka_width = (do_nauki / total) * canvas_width if total else 0; nauczone_width = (nauczone / total) * canvas_width if total else 0
+        self.stats_canvas.coords(self.pasek_do_nauki, 0, 0, nauka_width, 20); self.stats_canvas.coords(self.pasek_nauczone, nauka_width, 0, nauka_width + nauczone_width, 20)
+        for klucz, liczba, tekst in (('do_nauki', do_nauki, "Nie nauczone"), ('nauczone', nauczone, "Nauczone")):
+            legend_item, _, opis = self.legenda[klucz]; legend_item.pack_forget()
+            if liczba > 0: opis.config(text=f"{tekst}: {liczba}"); legend_item.pack(side='left', padx=10)
     def start_session(self):
         deck_name = self.deck_listbox.get(self.deck_listbox.curselection())
-        self.controller.frames['StudyScreen'].uruchom_przedmiot(deck_name)
+        self.controller.ekran('StudyScreen').uruchom_przedmiot(deck_name)
         self.controller.show_frame('StudyScreen')
     def browse_deck(self): self.controller.show_frame('BrowseScreen', self.deck_listbox.get(self.deck_listbox.curselection()), "WelcomeScreen")
     def show_stats(self): self.controller.show_frame('StatsScreen', self.deck_listbox.get(self.deck_listbox.curselection()))
@@ -239,28 +451,33 @@ class WelcomeScreen(ttk.Frame):
         if not self.deck_listbox.curselection(): return
         deck_name = self.deck_listbox.get(self.deck_listbox.curselection())
         if messagebox.askyesno("Potwierdzenie", f"Czy na pewno chcesz wyzerować cały postęp dla przedmiotu '{deck_name}'?"):
-            plik_postepu = f"{PLIK_POSTEPU_PREFIX}{deck_name}.json"
-            if os.path.exists(plik_postepu): os.remove(plik_postepu)
-            self.update_stats_display(self.get_deck_summary())
-            messagebox.showinfo("Sukces", "Postęp został wyzerowany.")
+            def po_wyzerowaniu(_):
+                if self.deck_listbox.curselection(): self.odswiez_podsumowanie()
+                messagebox.showinfo("Sukces", "Postęp został wyzerowany.")
+            self.controller.io.submit(self.controller.storage.reset_progress, deck_name, on_done=po_wyzerowaniu)
 
 class StudyScreen(ttk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent); self.controller = controller; self.timer_id = None
+        self.historia_cofania = deque(maxlen=HISTORIA_COFANIA_LIMIT); self.historia_ponawiania = deque(maxlen=HISTORIA_COFANIA_LIMIT)
         self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(1, weight=1)
         top_bar = ttk.Frame(self); top_bar.grid(row=0, column=0, sticky='ew', padx=10, pady=10)
         self.nazwa_przedmiotu_label = ttk.Label(top_bar, text="", style='Header.TLabel'); self.nazwa_przedmiotu_label.pack(side='left')
         context_bar = ttk.Frame(top_bar); context_bar.pack(side='right')
         self.browse_button = ttk.Button(context_bar, text="👁️ Przeglądaj", command=self.browse_deck_in_session); self.browse_button.pack(side='left', padx=10)
         self.cofnij_button = ttk.Button(context_bar, text="↩️ Cofnij Ocenę", command=self.cofnij_ocene, state='disabled'); self.cofnij_button.pack(side='left', padx=10)
+        self.ponow_button = ttk.Button(context_bar, text="↪️ Ponów", command=self.ponow_ocene, state='disabled'); self.ponow_button.pack(side='left', padx=(0, 10))
         ttk.Button(context_bar, text="Zakończ sesję", command=self.zakoncz_sesje_btn, style='Danger.TButton').pack(side='left')
         card_container = ttk.Frame(self, style='TFrame'); card_container.grid(row=1, column=0, sticky='nsew', padx=50, pady=20)
         card_container.grid_rowconfigure(0, weight=1); card_container.grid_columnconfigure(0, weight=1)
-        self.ramka_pytania = AnimatedCard(card_container, style='Card.TFrame')
+        self.ramka_pytania = AnimatedCard(card_container)
         self.ramka_pytania.grid(row=0, column=0, sticky='nsew')
-        self.label_pytanie = ttk.Label(self.ramka_pytania, text="...", style='Question.TLabel', wraplength=700, justify="center", anchor='center')
-        self.ramka_pytania.set_content(self.label_pytanie)
-        self.przyciski_kontrolne = ttk.Frame(self); self.przyciski_kontrolne.grid(row=2, column=0, pady=20)
+        # Przyciski budowane raz; między pytaniem a oceną tylko przełączamy, która grupa jest spakowana.
+        self.przyciski_kontrolne = ttk.Frame(self); self.przyciski_kontrolne.grid(row=2, column=0, pady=20); self.widoczne_przyciski = None
+        self.przycisk_pokaz_odpowiedz = ttk.Button(self.przyciski_kontrolne, text="Oceń (Spacja)", command=self.odwroc_karte, style='Highlight.TButton')
+        self.ramka_ocen = ttk.Frame(self.przyciski_kontrolne)
+        for ocena, tekst, styl in (('again', "[1] Nie umiem", 'Danger.TButton'), ('hard', "[2] Trudne", 'Warning.TButton'), ('good', "[3] Dobrze", 'Accent.TButton'), ('easy', "[4] Łatwe", 'Easy.TButton')):
+            ttk.Button(self.ramka_ocen, text=tekst, command=lambda o=ocena: self.ocen_karte(o), style=styl).pack(side='left', expand=True, fill='x', padx=5)
         self.status_bar = ttk.Frame(self); self.status_bar.grid(row=3, column=0, sticky='ew', padx=20, pady=5)
         self.new_label = ttk.Label(self.status_bar, text="Nowe: 0", font=('Segoe UI', 10, 'bold')); self.new_label.pack(side='left')
         self.review_label = ttk.Label(self.status_bar, text="Powtórki: 0", font=('Segoe UI', 10, 'bold')); self.review_label.pack(side='left', padx=20)
@@ -269,6 +486,7 @@ class StudyScreen(ttk.Frame):
         self.update_theme()
     def update_theme(self):
         theme = self.controller.theme
+        self.ramka_pytania.update_theme(theme)
         self.new_label.config(foreground=theme['secondary']); self.review_label.config(foreground=theme['warning']); self.done_label.config(foreground=theme['accent']); self.timer_label.config(foreground=theme['fg'])
     def on_show(self, *args):
         self.focus_set()
@@ -277,6 +495,8 @@ class StudyScreen(ttk.Frame):
         self.controller.bind('3', self.ocen_karte_skrot_3)
         self.controller.bind('4', self.ocen_karte_skrot_4)
         self.controller.bind('<space>', self.odwroc_karte_skrot)
+        self.controller.bind('<Control-z>', lambda e: self.cofnij_ocene())
+        self.controller.bind('<Control-y>', lambda e: self.ponow_ocene())
     def ocen_karte_skrot_1(self, event=None):
         if hasattr(self, 'stan_aplikacji') and self.stan_aplikacji == 'ocena': self.ocen_karte('again')
     def ocen_karte_skrot_2(self, event=None):
@@ -286,28 +506,31 @@ class StudyScreen(ttk.Frame):
     def ocen_karte_skrot_4(self, event=None):
         if hasattr(self, 'stan_aplikacji') and self.stan_aplikacji == 'ocena': self.ocen_karte('easy')
     def odwroc_karte_skrot(self, event=None):
-        if hasattr(self, 'stan_aplikacji') and self.stan_aplikacji == 'pytanie' and hasattr(self, 'przycisk_pokaz_odpowiedz') and self.przycisk_pokaz_odpowiedz.winfo_exists(): self.przycisk_pokaz_odpowiedz.invoke()
+        if hasattr(self, 'stan_aplikacji') and self.stan_aplikacji == 'pytanie': self.odwroc_karte()
     def uruchom_przedmiot(self, nazwa_przedmiotu):
         self.nazwa_przedmiotu = nazwa_przedmiotu; self.nazwa_przedmiotu_label.config(text=f"Przedmiot: {nazwa_przedmiotu}")
-        self.wczytaj_dane_przedmiotu(); self.rozpocznij_sesje()
+        self.karty = None; self.biezaca_karta = None; self.stan_aplikacji = 'ladowanie'; self.pokaz_przyciski(None)
+        self.ramka_pytania.set_text("⏳ Wczytywanie talii..."); self.ramka_pytania.reset()
+        self.wczytaj_dane_przedmiotu()
+    def wczytaj_dane_przedmiotu(self):
+        nazwa_przedmiotu = self.nazwa_przedmiotu
+        def gotowe(karty):
+            if self.nazwa_przedmiotu != nazwa_przedmiotu or self.stan_aplikacji != 'ladowanie': return  # sesję zmieniono w trakcie wczytywania
+            self.karty = karty; self.indeksuj_karty(); self.rozpocznij_sesje()
+        self.controller.io.submit(self.controller.storage.load_session_cards, nazwa_przedmiotu, on_done=gotowe)
     def rozpocznij_sesje(self):
-        self.previous_state = None; self.cofnij_button.config(state='disabled')
-        now = datetime.now()
-        karty_do_powtorki = [k for k in self.karty if k['status'] != 'new' and datetime.fromisoformat(k['due_date']) <= now]
-        karty_nowe = [k for k in self.karty if k['status'] == 'new']
-        self.kolejka = sorted(karty_do_powtorki, key=lambda x: x['due_date']) + karty_nowe
-        random.shuffle(self.kolejka); self.karty_zrobione_w_sesji = 0
+        self.historia_cofania.clear(); self.historia_ponawiania.clear(); self.biezaca_karta = None
+        limit = self.controller.settings.get('new_cards_per_day')
+        self.harmonogram = Harmonogram(self.karty, limit_nowych=max(0, limit - self.nowe_dzisiaj()) if limit > 0 else None, odstep_nowych=self.controller.settings.get('new_card_spacing'))
+        self.karty_zrobione_w_sesji = 0
         self.aktualizuj_licznik_statusu(); self.nastepna_karta()
     def nastepna_karta(self):
-        self.cofnij_button.config(state='disabled')
+        self.odswiez_przyciski_cofania()
         if self.timer_id: self.after_cancel(self.timer_id); self.timer_id = None; self.timer_label.config(text="")
-        for widget in self.przyciski_kontrolne.winfo_children(): widget.destroy()
-        if not self.kolejka: self.koniec_sesji(); return
-        self.biezaca_karta = self.kolejka[0]
-        self.label_pytanie.config(text=self.biezaca_karta['pytanie'])
-        self.ramka_pytania.reset()
-        self.przycisk_pokaz_odpowiedz = ttk.Button(self.przyciski_kontrolne, text="Oceń (Spacja)", command=self.odwroc_karte, style='Highlight.TButton')
-        self.przycisk_pokaz_odpowiedz.pack(ipady=10, ipadx=20)
+        self.biezaca_karta = self.harmonogram.nastepna()
+        if self.biezaca_karta is None: self.pokaz_przyciski(None); self.koniec_sesji(); return
+        self.ramka_pytania.set_text(self.biezaca_karta.pytanie)
+        self.ramka_pytania.reset(); self.pokaz_przyciski('pytanie')
         self.stan_aplikacji = 'pytanie'
         self.aktualizuj_licznik_statusu()
         timer_duration_minutes = self.controller.settings.get('timer_duration')
@@ -321,72 +544,86 @@ class StudyScreen(ttk.Frame):
     def odwroc_karte(self):
         if self.stan_aplikacji != 'pytanie': return
         if self.timer_id: self.after_cancel(self.timer_id); self.timer_id = None; self.timer_label.config(text="")
-        self.controller.sound_manager.play('flip'); self.ramka_pytania.flip(on_complete=self.pokaz_oceny)
+        self.controller.sound_manager.play('flip'); self.ramka_pytania.flip(on_complete=self.pokaz_oceny, animacja=self.controller.settings.get('flip_animation'))
+    def pokaz_przyciski(self, stan):
+        # stan: 'pytanie', 'ocena' albo None (brak przycisków); bez zmiany stanu nic nie jest przepakowywane.
+        if stan == self.widoczne_przyciski: return
+        self.przycisk_pokaz_odpowiedz.pack_forget(); self.ramka_ocen.pack_forget(); self.widoczne_przyciski = stan
+        if stan == 'pytanie': self.przycisk_pokaz_odpowiedz.pack(ipady=10, ipadx=20)
+        elif stan == 'ocena': self.ramka_ocen.pack(fill='x')
     def pokaz_oceny(self):
-        for widget in self.przyciski_kontrolne.winfo_children(): widget.destroy()
-        ttk.Button(self.przyciski_kontrolne, text="[1] Nie umiem", command=lambda: self.ocen_karte('again'), style='Danger.TButton').pack(side='left', expand=True, fill='x', padx=5)
-        ttk.Button(self.przyciski_kontrolne, text="[2] Trudne", command=lambda: self.ocen_karte('hard'), style='Warning.TButton').pack(side='left', expand=True, fill='x', padx=5)
-        ttk.Button(self.przyciski_kontrolne, text="[3] Dobrze", command=lambda: self.ocen_karte('good'), style='Accent.TButton').pack(side='left', expand=True, fill='x', padx=5)
-        ttk.Button(self.przyciski_kontrolne, text="[4] Łatwe", command=lambda: self.ocen_karte('easy'), style='Easy.TButton').pack(side='left', expand=True, fill='x', padx=5)
-        self.stan_aplikacji = 'ocena'
+        self.pokaz_przyciski('ocena'); self.stan_aplikacji = 'ocena'
     def ocen_karte(self, ocena: str):
         if not hasattr(self, 'biezaca_karta') or not self.biezaca_karta: return
-        self.previous_state = {'karty': copy.deepcopy(self.karty), 'kolejka': copy.deepcopy(self.kolejka), 'done_count': self.karty_zrobione_w_sesji}
-        self.cofnij_button.config(state='normal')
-        karta_z_kolejki = self.kolejka.pop(0)
-        karta = next((k for k in self.karty if k['id'] == karta_z_kolejki['id']), None)
+        karta = self.karty_po_id.get(self.biezaca_karta.id)
         if karta is None: self.nastepna_karta(); return
-        now = datetime.now()
-        if ocena == 'again':
-            self.controller.sound_manager.play('incorrect'); karta['status'] = 'learning'; karta['interval'] = SRS_INTERVALS['again'].total_seconds()
-            karta['due_date'] = (now + SRS_INTERVALS['again']).isoformat(); self.kolejka.insert(random.randint(0, min(len(self.kolejka), 3)), karta)
-        else:
-            self.controller.sound_manager.play('correct')
-            if karta['status'] in ['new', 'learning']:
-                if ocena == 'hard': karta['interval'] = SRS_INTERVALS['hard'].total_seconds()
-                elif ocena == 'good': karta['interval'] = SRS_INTERVALS['good_initial'].total_seconds()
-                elif ocena == 'easy': karta['interval'] = SRS_INTERVALS['easy_initial'].total_seconds()
-            elif karta['status'] == 'review':
-                if ocena == 'hard': karta['interval'] *= 1.2
-                elif ocena == 'good': karta['interval'] *= SRS_INTERVALS['good_factor']
-                elif ocena == 'easy': karta['interval'] *= SRS_INTERVALS['good_factor'] * SRS_INTERVALS['easy_factor_bonus']
-            karta['status'] = 'review'; karta['due_date'] = (now + timedelta(seconds=karta['interval'])).isoformat()
-            self.karty_zrobione_w_sesji += 1
-        self.nastepna_karta()
+        now = time.time(); start = time.perf_counter()
+        wpis = {'karta': karta, 'przed': {p: getattr(karta, p) for p in POLA_STANU_KARTY}, 'nowa': karta.status == StatusKarty.NEW, 'zrobiona': ocena != 'again'}
+        if wpis['nowa']: self.zlicz_nowa_karte(1)
+        self.controller.sound_manager.play('incorrect' if ocena == 'again' else 'correct'); zastosuj_ocene(karta, ocena, now, self.controller.planista)
+        if wpis['zrobiona']: self.karty_zrobione_w_sesji += 1
+        wpis['seq'] = self.harmonogram.dodaj(karta, now); wpis['po'] = {p: getattr(karta, p) for p in POLA_STANU_KARTY}
+        wpis['historia'] = wpis_historii(ocena, (wpis['przed']['status'], wpis['przed']['interval']), karta, now)
+        self.historia_cofania.append(wpis); self.historia_ponawiania.clear()
+        self.zapisz_ocene(karta, wpis['historia'])
+        self.nastepna_karta(); self.controller.profiler.zapisz('ocena', ocena, (time.perf_counter() - start) * 1000)
     def cofnij_ocene(self):
-        if not self.previous_state: return
-        self.karty = self.previous_state['karty']; self.kolejka = self.previous_state['kolejka']
-        self.karty_zrobione_w_sesji = self.previous_state['done_count']
-        self.previous_state = None; self.cofnij_button.config(state='disabled')
+        # Dziennik zmian zamiast kopii talii: przywracamy tylko pola jednej karty i jej miejsce w kolejce.
+        if not self.historia_cofania or not hasattr(self, 'harmonogram'): return
+        wpis = self.historia_cofania.pop(); karta = wpis['karta']
+        self.zmien_stan_karty(karta, wpis['przed'])
+        if wpis['seq'] is not None: self.harmonogram.usun(wpis['seq'])
+        if self.biezaca_karta and self.biezaca_karta is not karta: self.harmonogram.przywroc(self.biezaca_karta)
+        self.harmonogram.przywroc(karta)
+        if wpis['nowa']: self.zlicz_nowa_karte(-1)
+        if wpis['zrobiona']: self.karty_zrobione_w_sesji -= 1
+        self.historia_ponawiania.append(wpis); self.zapisz_ocene(karta, (wpis['historia'][0], OCENA_COFNIETA, 0, 0.0, 0.0))
+        self.nastepna_karta()
+    def ponow_ocene(self):
+        if not self.historia_ponawiania or self.historia_ponawiania[-1]['karta'] is not self.biezaca_karta: return
+        wpis = self.historia_ponawiania.pop(); karta = wpis['karta']
+        self.zmien_stan_karty(karta, wpis['po'])
+        if wpis['seq'] is not None: wpis['seq'] = self.harmonogram.dodaj(karta)
+        if wpis['nowa']: self.zlicz_nowa_karte(1)
+        if wpis['zrobiona']: self.karty_zrobione_w_sesji += 1
+        self.historia_cofania.append(wpis); self.zapisz_ocene(karta, wpis['historia'])
         self.nastepna_karta()
+    def odswiez_przyciski_cofania(self):
+        self.cofnij_button.config(state='normal' if self.historia_cofania else 'disabled')
+        self.ponow_button.config(state='normal' if self.historia_ponawiania else 'disabled')
     def browse_deck_in_session(self): self.controller.show_frame('BrowseScreen', self.nazwa_przedmiotu, "StudyScreen")
-    def zakoncz_sesje_btn(self): self.zapisz_postep(); self.controller.show_frame("WelcomeScreen")
-    def koniec_sesji(self): self.zapisz_postep(); self.controller.show_frame("WelcomeScreen")
+    def zakoncz_sesje_btn(self): self.koniec_sesji()
+    def koniec_sesji(self):
+        self.historia_cofania.clear(); self.historia_ponawiania.clear(); self.stan_aplikacji = 'koniec'
+        self.zapisz_postep(); self.controller.show_frame("WelcomeScreen")
     def aktualizuj_licznik_statusu(self):
-        nowe_w_kolejce = sum(1 for k in self.kolejka if k['status'] == 'new'); powtorki_w_kolejce = len(self.kolejka) - nowe_w_kolejce
+        nowe_w_kolejce = self.harmonogram.liczba_nowych(); powtorki_w_kolejce = self.harmonogram.liczba_powtorek()
+        if self.biezaca_karta:
+            if self.biezaca_karta.status == StatusKarty.NEW: nowe_w_kolejce += 1
+            else: powtorki_w_kolejce += 1
         self.new_label.config(text=f"Nowe: {nowe_w_kolejce}"); self.review_label.config(text=f"Powtórki: {powtorki_w_kolejce}"); self.done_label.config(text=f"Ukończone: {self.karty_zrobione_w_sesji}")
-    def wczytaj_dane_przedmiotu(self):
-        plik_przedmiotu = os.path.join(FOLDER_PRZEDMIOTOW, f"{self.nazwa_przedmiotu}.txt"); plik_postepu = f"{PLIK_POSTEPU_PREFIX}{self.nazwa_przedmiotu}.json"
-        pytania_z_pliku = []
-        if os.path.exists(plik_przedmiotu):
-            with open(plik_przedmiotu, 'r', encoding='utf-8') as f: pytania_z_pliku = [line.strip() for line in f if line.strip()]
-        postep_by_question = {}
-        if os.path.exists(plik_postepu):
-            try:
-                with open(plik_postepu, 'r', encoding='utf-8') as f:
-                    postep_data = json.load(f)
-                    if isinstance(postep_data, list): postep_by_question = {p['pytanie']: p for p in postep_data if isinstance(p, dict) and 'pytanie' in p}
-            except (json.JSONDecodeError, TypeError): pass 
-        self.karty = []
-        for pytanie_text in pytania_z_pliku:
-            if pytanie_text in postep_by_question: self.karty.append(postep_by_question[pytanie_text])
-            else: self.karty.append(self.stworz_nowa_karte(pytanie_text))
-    def stworz_nowa_karte(self, pytanie_text): return {"id": str(uuid.uuid4()), "pytanie": pytanie_text, "status": "new", "due_date": datetime.now().isoformat(), "interval": 0}
+    def nowe_dzisiaj(self):
+        wpis = self.controller.settings.get('new_cards_today').get(self.nazwa_przedmiotu)
+        return wpis[1] if wpis and wpis[0] == date.today().isoformat() else 0
+    def zlicz_nowa_karte(self, delta):
+        licznik = dict(self.controller.settings.get('new_cards_today'))
+        licznik[self.nazwa_przedmiotu] = [date.today().isoformat(), max(0, self.nowe_dzisiaj() + delta)]
+        self.controller.settings.set('new_cards_today', licznik)
+    def indeksuj_karty(self):
+        # Indeks id -> karta; liczniki na pasku stanu bierzemy z harmonogramu.
+        self.karty_po_id = {k.id: k for k in self.karty}
+    def zmien_stan_karty(self, karta, stan):
+        for pole, wartosc in stan.items(): setattr(karta, pole, wartosc)
     def zapisz_postep(self):
         if not hasattr(self, 'nazwa_przedmiotu') or not self.nazwa_przedmiotu: return
-        plik_postepu = f"{PLIK_POSTEPU_PREFIX}{self.nazwa_przedmiotu}.json"
-        if hasattr(self, 'karty'):
-            with open(plik_postepu, 'w', encoding='utf-8') as f: json.dump(self.karty, f, ensure_ascii=False, indent=2)
+        if getattr(self, 'karty', None) is None: return
+        # Kopie kart zrobione w wątku Tk - snapshot i podsumowanie nie mogą złapać karty w połowie oceny.
+        self.controller.io.submit(self.controller.storage.save_progress, self.nazwa_przedmiotu, [Karta(*k.stan()) for k in self.karty])
+    def zapisz_ocene(self, karta, historia):
+        # Kopia stanu karty - zapis odbywa się w wątku I/O, a nauka toczy się dalej. Cofnięcie trafia do historii jako osobny znacznik.
+        self.controller.io.submit(self.controller.storage.record_history, self.nazwa_przedmiotu, historia)
+        self.controller.io.submit(self.controller.storage.record_review, self.nazwa_przedmiotu, Karta(*karta.stan()),
+                                  on_done=lambda kompaktuj: kompaktuj and self.zapisz_postep())
 
 class StatsScreen(ttk.Frame):
     def __init__(self, parent, controller):
@@ -394,21 +631,37 @@ class StatsScreen(ttk.Frame):
         top_frame = ttk.Frame(self); top_frame.pack(fill='x', padx=10, pady=10)
         self.title_label = ttk.Label(top_frame, text="Statystyki", style='Title.TLabel'); self.title_label.pack(side='left')
         ttk.Button(top_frame, text="← Wróć", command=lambda: controller.show_frame("WelcomeScreen")).pack(side='right')
-        main_frame = ttk.Frame(self); main_frame.pack(fill='both', expand=True, padx=20, pady=10)
-        self.canvas = tk.Canvas(main_frame, highlightthickness=0); self.canvas.pack(side='left', fill='both', expand=True, padx=20)
-        right_panel = ttk.Frame(main_frame); right_panel.pack(side='left', fill='y', padx=20)
-        self.legend_frame = ttk.Frame(right_panel); self.legend_frame.pack(anchor='n', pady=20)
-        wnioski_frame = ttk.Frame(right_panel, style='Card.TFrame', padding=15); wnioski_frame.pack(anchor='n', pady=20, fill='x')
+        main_frame = ttk.Frame(self); main_frame.pack(fill='x', padx=20)
+        self.canvas = tk.Canvas(main_frame, width=340, height=340, highlightthickness=0); self.canvas.pack(side='left', padx=10)
+        self.legend_frame = ttk.Frame(main_frame); self.legend_frame.pack(side='left', anchor='n', pady=20, padx=10)
+        right_panel = ttk.Frame(main_frame); right_panel.pack(side='left', fill='y', padx=10)
+        wnioski_frame = ttk.Frame(right_panel, style='Card.TFrame', padding=15); wnioski_frame.pack(anchor='n', pady=10, fill='x')
         ttk.Label(wnioski_frame, text="Wnioski", style='Card.Header.TLabel').pack(anchor='w')
         self.wnioski_label = ttk.Label(wnioski_frame, text="", style='Card.TLabel', wraplength=250, justify='left'); self.wnioski_label.pack(anchor='w', pady=5)
+        skutecznosc_frame = ttk.Frame(right_panel, style='Card.TFrame', padding=15); skutecznosc_frame.pack(anchor='n', pady=10, fill='x')
+        ttk.Label(skutecznosc_frame, text="Skuteczność powtórek", style='Card.Header.TLabel').pack(anchor='w')
+        self.skutecznosc_label = ttk.Label(skutecznosc_frame, text="", style='Card.TLabel', justify='left'); self.skutecznosc_label.pack(anchor='w', pady=5)
+        # Prognoza powtórek i histogram interwałów; analiza liczona raz na 365 dni, przełącznik tylko przerysowuje wykres.
+        wykresy_frame = ttk.Frame(self); wykresy_frame.pack(fill='both', expand=True, padx=20, pady=10)
+        prognoza_frame = ttk.Frame(wykresy_frame); prognoza_frame.pack(side='left', fill='both', expand=True)
+        naglowek = ttk.Frame(prognoza_frame); naglowek.pack(fill='x')
+        ttk.Label(naglowek, text="Prognoza powtórek", font=('Segoe UI', 12, 'bold')).pack(side='left')
+        self.horyzont_var = tk.IntVar(value=30); self.analiza = None
+        for dni in (365, 90, 30): ttk.Radiobutton(naglowek, text=f"{dni} dni", value=dni, variable=self.horyzont_var, command=self.rysuj_prognoze).pack(side='right', padx=3)
+        self.prognoza_canvas = tk.Canvas(prognoza_frame, width=540, height=200, highlightthickness=0); self.prognoza_canvas.pack(fill='both', expand=True, pady=5)
+        histogram_frame = ttk.Frame(wykresy_frame); histogram_frame.pack(side='left', fill='both', padx=(20, 0))
+        ttk.Label(histogram_frame, text="Interwały kart", font=('Segoe UI', 12, 'bold')).pack(anchor='w')
+        self.histogram_canvas = tk.Canvas(histogram_frame, width=320, height=200, highlightthickness=0); self.histogram_canvas.pack(fill='both', expand=True, pady=5)
         self.update_theme()
-    def update_theme(self): self.canvas.config(bg=self.controller.theme['bg'])
+    def update_theme(self):
+        for canvas in (self.canvas, self.prognoza_canvas, self.histogram_canvas): canvas.config(bg=self.controller.theme['bg'])
+        if self.analiza: self.rysuj_analize()
     def draw_pie_chart(self, summary):
         self.canvas.delete("all");
         for widget in self.legend_frame.winfo_children(): widget.destroy()
         total = sum(summary.values())
         if total == 0:
-            self.canvas.create_text(250, 250, text="Brak danych do wyświetlenia.", fill=self.controller.theme['fg'], font=('Segoe UI', 14))
+            self.canvas.create_text(170, 170, text="Brak danych do wyświetlenia.", fill=self.controller.theme['fg'], font=('Segoe UI', 14))
             self.wnioski_label.config(text="Dodaj karty do przedmiotu."); return
         colors = {'new': self.controller.theme['secondary'], 'learning': self.controller.theme['warning'], 'young': self.controller.theme['accent'], 'mature': self.controller.theme['easy']}
         names = {'new': 'Nowe', 'learning': 'W Nauce', 'young': 'Młode', 'mature': 'Dojrzałe'}
@@ -416,7 +669,7 @@ class StatsScreen(ttk.Frame):
         for key, value in summary.items():
             if value > 0:
                 extent = (value / total) * 360
-                self.canvas.create_arc(50, 50, 450, 450, start=start_angle, extent=-extent, fill=colors[key], outline=self.controller.theme['bg'], width=3)
+                self.canvas.create_arc(20, 20, 320, 320, start=start_angle, extent=-extent, fill=colors[key], outline=self.controller.theme['bg'], width=3)
                 legend_item = ttk.Frame(self.legend_frame); legend_item.pack(anchor='w', pady=5)
                 ttk.Label(legend_item, text="●", foreground=colors[key], font=('Segoe UI', 20)).pack(side='left')
                 ttk.Label(legend_item, text=f"{names[key]}: {value} ({value/total:.1%})", font=('Segoe UI', 12)).pack(side='left', padx=10)
@@ -428,10 +681,43 @@ class StatsScreen(ttk.Frame):
         elif nauczone_proc > 0.5: return "Dobry postęp! Ponad połowa kart jest nauczona. Skup się na kartach 'W Nauce'."
         elif summary['new'] == total: return "Czas zacząć! Wszystkie karty w tym przedmiocie są nowe. Rozpocznij sesję."
         else: return "Przed Tobą jeszcze trochę pracy. Regularne sesje pomogą Ci szybko opanować materiał."
+    def rysuj_slupki(self, canvas, wartosci, etykiety, kolor):
+        # Prosty wykres słupkowy; etykiety to {indeks słupka: tekst pod osią}.
+        canvas.delete("all"); theme = self.controller.theme
+        szerokosc, wysokosc = int(canvas['width']), int(canvas['height']); dol = wysokosc - 20; maks = max(wartosci, default=0)
+        canvas.create_line(0, dol, szerokosc, dol, fill=theme['border'])
+        if not maks: canvas.create_text(szerokosc / 2, dol / 2, text="Brak danych", fill=theme['fg'], font=('Segoe UI', 11)); return
+        krok = szerokosc / len(wartosci)
+        canvas.create_text(2, 2, text=str(maks), anchor='nw', fill=theme['fg'], font=('Segoe UI', 8))
+        for i, wartosc in enumerate(wartosci):
+            if wartosc: canvas.create_rectangle(i * krok + 1, dol - (dol - 15) * wartosc / maks, (i + 1) * krok - 1, dol, fill=kolor, outline='')
+            if i in etykiety: canvas.create_text(i * krok + krok / 2, dol + 10, text=etykiety[i], fill=theme['fg'], font=('Segoe UI', 8))
+    def rysuj_prognoze(self):
+        if not self.analiza: return
+        horyzont = self.horyzont_var.get(); prognoza = self.analiza['forecast'][:horyzont]
+        if horyzont > 90:  # rok w tygodniach - 53 słupki zamiast 365
+            prognoza = [sum(prognoza[i:i + 7]) for i in range(0, horyzont, 7)]; etykiety = {i: f"+{i}t" for i in range(0, len(prognoza), 8)}
+        else: etykiety = {i: ("dziś" if i == 0 else f"+{i}d") for i in range(0, horyzont, 7 if horyzont <= 30 else 14)}
+        self.rysuj_slupki(self.prognoza_canvas, prognoza, etykiety, self.controller.theme['warning'])
+    def rysuj_analize(self):
+        granice = PRZEDZIALY_INTERWALOW
+        etykiety = {i: (f"{a}-{b}" if b is not None else f"{a}+") for i, (a, b) in enumerate(zip(granice, granice[1:] + (None,)))}
+        self.rysuj_prognoze(); self.rysuj_slupki(self.histogram_canvas, self.analiza['intervals'], etykiety, self.controller.theme['accent'])
+        opisy = (('all', "Wszystkie"), ('young', "Młode"), ('mature', "Dojrzałe"), ('last_30', "Ostatnie 30 dni"))
+        wiersze = [f"{opis}: {ok / razem:.1%} ({ok}/{razem})" if razem else f"{opis}: -" for klucz, opis in opisy for ok, razem in [self.analiza['retention'][klucz]]]
+        self.skutecznosc_label.config(text="\n".join(wiersze) + f"\nOcen w historii: {self.analiza['reviews']}")
     def on_show(self, deck_name):
-        self.title_label.config(text=f"Statystyki: {deck_name}")
-        summary = self.controller.frames['WelcomeScreen'].get_deck_summary(deck_name)
-        self.draw_pie_chart(summary)
+        self.title_label.config(text=f"Statystyki: {deck_name} ⏳"); self.deck_name = deck_name; self.analiza = None
+        for canvas in (self.prognoza_canvas, self.histogram_canvas): canvas.delete("all")
+        self.skutecznosc_label.config(text="")
+        def gotowe(summary):
+            if self.deck_name != deck_name: return
+            self.title_label.config(text=f"Statystyki: {deck_name}"); self.draw_pie_chart(summary)
+        def analiza_gotowa(analiza):
+            if self.deck_name != deck_name: return
+            self.analiza = analiza; self.rysuj_analize()
+        self.controller.io.submit(self.controller.storage.summary, deck_name, on_done=gotowe)
+        self.controller.io.submit(self.controller.storage.analytics, deck_name, on_done=analiza_gotowa)
 
 class BrowseScreen(ttk.Frame):
     def __init__(self, parent, controller):
@@ -439,29 +725,36 @@ class BrowseScreen(ttk.Frame):
         top_frame = ttk.Frame(self); top_frame.pack(fill='x', padx=10, pady=10)
         self.title_label = ttk.Label(top_frame, text="Przeglądaj", style='Title.TLabel'); self.title_label.pack(side='left')
         self.back_button = ttk.Button(top_frame, text="← Wróć", command=lambda: controller.show_frame("WelcomeScreen")); self.back_button.pack(side='right')
-        self.listbox = Listbox(self, font=('Segoe UI', 11), relief='flat', borderwidth=0)
+        self.search_var = tk.StringVar(); self.search_var.trace_add('write', lambda *args: self.filtruj())
+        search_frame = ttk.Frame(self); search_frame.pack(fill='x', padx=20)
+        ttk.Label(search_frame, text="🔍").pack(side='left'); ttk.Entry(search_frame, textvariable=self.search_var).pack(side='left', fill='x', expand=True, padx=5)
+        self.karty = []; self.indeks = IndeksWyszukiwania()
+        self.listbox = VirtualList(self, row_font=('Segoe UI', 11))
         self.listbox.pack(fill='both', expand=True, padx=20, pady=10)
         self.update_theme()
     def update_theme(self): self.listbox.config(bg=self.controller.theme['frame_bg'], fg=self.controller.theme['fg'], selectbackground=self.controller.theme['highlight'], selectforeground=self.controller.theme['button_fg'])
     def on_show(self, deck_name, return_screen="WelcomeScreen"):
-        self.title_label.config(text=f"Przeglądaj: {deck_name}"); self.back_button.config(command=lambda: self.controller.show_frame(return_screen))
-        self.listbox.delete(0, 'end')
-        plik_postepu = f"{PLIK_POSTEPU_PREFIX}{deck_name}.json"
-        karty = []
-        if not os.path.exists(plik_postepu):
-            plik_przedmiotu = os.path.join(FOLDER_PRZEDMIOTOW, f"{deck_name}.txt")
-            if os.path.exists(plik_przedmiotu):
-                with open(plik_przedmiotu, 'r', encoding='utf-8') as f: karty = [{'pytanie': line.strip(), 'status': 'new'} for line in f if line.strip()]
-        else:
-            with open(plik_postepu, 'r', encoding='utf-8') as f:
-                try: karty = json.load(f)
-                except json.JSONDecodeError: karty = []
-        now = datetime.now()
-        for i, k in enumerate(sorted(karty, key=lambda x: x['pytanie'])):
-            self.listbox.insert('end', k['pytanie'])
-            is_learned = k.get('status') in ['young', 'mature'] and datetime.fromisoformat(k.get('due_date', now.isoformat())) > now
-            final_bg_color = self.controller.theme['accent'] if is_learned else self.controller.theme['danger']
-            self.listbox.itemconfig(i, {'bg': final_bg_color, 'fg': self.controller.theme['button_fg']})
+        self.title_label.config(text=f"Przeglądaj: {deck_name} ⏳"); self.back_button.config(command=lambda: self.controller.show_frame(return_screen))
+        self.deck_name = deck_name; self.karty = []; self.indeks = IndeksWyszukiwania(); self.listbox.delete(0, 'end')
+        def wczytaj():
+            # Sortowanie i budowa indeksu też w wątku I/O - dla dużych talii to najdroższa część.
+            karty = sorted(self.controller.storage.browse_cards(deck_name), key=lambda x: x.pytanie); indeks = IndeksWyszukiwania()
+            for i, k in enumerate(karty): indeks.dodaj(i, k.pytanie)
+            return karty, indeks
+        def gotowe(wynik):
+            if self.deck_name != deck_name: return
+            self.karty, self.indeks = wynik; self.title_label.config(text=f"Przeglądaj: {deck_name}")
+            if self.search_var.get(): self.search_var.set("")
+            else: self.filtruj()
+        self.controller.io.submit(wczytaj, on_done=gotowe)
+    def filtruj(self):
+        karty = self.karty; now = time.time(); trafienia = self.indeks.szukaj(self.search_var.get())
+        wiersze = range(len(karty)) if trafienia is None else sorted(trafienia)
+        def kolory(i):
+            # Kolor liczony dopiero przy rysowaniu widocznego wiersza.
+            k = karty[wiersze[i]]; is_learned = k.status != StatusKarty.NEW and k.due > now
+            return (self.controller.theme['accent'] if is_learned else self.controller.theme['danger'], self.controller.theme['button_fg'])
+        self.listbox.set_items(len(wiersze), lambda i: karty[wiersze[i]].pytanie, kolory)
 
 class SettingsScreen(ttk.Frame):
     def __init__(self, parent, controller):
@@ -472,28 +765,62 @@ class SettingsScreen(ttk.Frame):
         main_frame = ttk.Frame(self, style='Card.TFrame', padding=20); main_frame.pack(fill='both', expand=True, padx=50, pady=20)
         self.theme_var = tk.StringVar(value=self.controller.settings.get('theme'))
         self.sound_var = tk.BooleanVar(value=self.controller.settings.get('sound_enabled'))
+        self.animation_var = tk.BooleanVar(value=self.controller.settings.get('flip_animation'))
         self.timer_var = tk.IntVar(value=self.controller.settings.get('timer_duration'))
+        self.new_limit_var = tk.IntVar(value=self.controller.settings.get('new_cards_per_day'))
+        self.new_spacing_var = tk.IntVar(value=self.controller.settings.get('new_card_spacing'))
+        self.storage_var = tk.StringVar(value=self.controller.settings.get('storage_backend'))
+        self.scheduler_var = tk.StringVar(value=self.controller.planista.opis)
+        self.retention_var = tk.DoubleVar(value=self.controller.settings.get('desired_retention'))
         theme_frame = ttk.Frame(main_frame, style='Card.TFrame'); theme_frame.pack(fill='x', pady=10)
         ttk.Label(theme_frame, text="Motyw aplikacji:", style='Card.Header.TLabel').pack(anchor='w')
         ttk.Radiobutton(theme_frame, text="Ciemny", variable=self.theme_var, value="Dark", command=self.apply_theme, style='Card.TRadiobutton').pack(anchor='w', padx=10)
         ttk.Radiobutton(theme_frame, text="Jasny", variable=self.theme_var, value="Light", command=self.apply_theme, style='Card.TRadiobutton').pack(anchor='w', padx=10)
         sound_frame = ttk.Frame(main_frame, style='Card.TFrame'); sound_frame.pack(fill='x', pady=10)
-        ttk.Label(sound_frame, text="Dźwięki:", style='Card.Header.TLabel').pack(anchor='w')
+        ttk.Label(sound_frame, text="Dźwięki i animacje:", style='Card.Header.TLabel').pack(anchor='w')
         ttk.Checkbutton(sound_frame, text="Włącz efekty dźwiękowe", variable=self.sound_var, style='Card.TCheckbutton').pack(anchor='w', padx=10)
+        ttk.Checkbutton(sound_frame, text="Animacja odwracania karty (wyłączona = szybsze ocenianie)", variable=self.animation_var, style='Card.TCheckbutton').pack(anchor='w', padx=10)
+        storage_frame = ttk.Frame(main_frame, style='Card.TFrame'); storage_frame.pack(fill='x', pady=10)
+        ttk.Label(storage_frame, text="Przechowywanie danych:", style='Card.Header.TLabel').pack(anchor='w')
+        ttk.Radiobutton(storage_frame, text="Pliki (decks/*.txt + progress_*.json)", variable=self.storage_var, value="files", style='Card.TRadiobutton').pack(anchor='w', padx=10)
+        ttk.Radiobutton(storage_frame, text="Pliki z binarnym postępem (progress_*.bin, szybsze wczytywanie dużych talii)", variable=self.storage_var, value="binary", style='Card.TRadiobutton').pack(anchor='w', padx=10)
+        ttk.Radiobutton(storage_frame, text=f"Baza SQLite ({PLIK_BAZY}, przy pierwszym użyciu importuje pliki)", variable=self.storage_var, value="sqlite", style='Card.TRadiobutton').pack(anchor='w', padx=10)
         timer_frame = ttk.Frame(main_frame, style='Card.TFrame'); timer_frame.pack(fill='x', pady=10)
         ttk.Label(timer_frame, text="Limit czasu na odpowiedź (w minutach, 0 = wyłączony):", style='Card.Header.TLabel').pack(anchor='w')
         ttk.Spinbox(timer_frame, from_=0, to=60, increment=1, textvariable=self.timer_var, width=10).pack(anchor='w', padx=10, pady=5)
+        session_frame = ttk.Frame(main_frame, style='Card.TFrame'); session_frame.pack(fill='x', pady=10)
+        ttk.Label(session_frame, text="Limit nowych kart dziennie (0 = bez limitu):", style='Card.Header.TLabel').pack(anchor='w')
+        ttk.Spinbox(session_frame, from_=0, to=9999, increment=5, textvariable=self.new_limit_var, width=10).pack(anchor='w', padx=10, pady=5)
+        ttk.Label(session_frame, text="Nowa karta co ile powtórek (0 = najpierw nowe):", style='Card.Header.TLabel').pack(anchor='w')
+        ttk.Spinbox(session_frame, from_=0, to=50, increment=1, textvariable=self.new_spacing_var, width=10).pack(anchor='w', padx=10, pady=5)
+        ttk.Label(session_frame, text="Algorytm powtórek (retencja docelowa dla FSRS):", style='Card.Header.TLabel').pack(anchor='w')
+        scheduler_row = ttk.Frame(session_frame, style='Card.TFrame'); scheduler_row.pack(anchor='w', padx=10, pady=5)
+        ttk.Combobox(scheduler_row, textvariable=self.scheduler_var, values=[p.opis for p in PLANISTY.values()], state='readonly', width=30).pack(side='left')
+        ttk.Spinbox(scheduler_row, from_=0.7, to=0.97, increment=0.01, textvariable=self.retention_var, width=6).pack(side='left', padx=10)
         about_frame = ttk.Frame(main_frame, style='Card.TFrame'); about_frame.pack(fill='x', pady=20, side='bottom')
         ttk.Label(about_frame, text=f"mojaNauka v{APP_VERSION}", style='Card.TLabel').pack()
         ttk.Label(about_frame, text="by Arychats (GitHub) © 2025", style='Card.TLabel').pack()
         self.update_theme()
     def apply_theme(self): self.controller.set_theme(self.theme_var.get())
     def save_and_exit(self):
-        self.controller.settings.set('theme', self.theme_var.get()); self.controller.settings.set('sound_enabled', self.sound_var.get())
-        self.controller.settings.set('timer_duration', self.timer_var.get()); self.controller.show_frame("WelcomeScreen")
+        self.controller.settings.set('theme', self.theme_var.get()); self.controller.settings.set('sound_enabled', self.sound_var.get()); self.controller.settings.set('flip_animation', self.animation_var.get())
+        self.controller.settings.set('timer_duration', self.timer_var.get()); self.controller.settings.set('new_cards_per_day', self.new_limit_var.get())
+        self.controller.settings.set('new_card_spacing', self.new_spacing_var.get()); self.controller.set_storage(self.storage_var.get())
+        nazwa = next(n for n, p in PLANISTY.items() if p.opis == self.scheduler_var.get())
+        try: retencja = min(max(round(self.retention_var.get(), 2), 0.7), 0.97)
+        except tk.TclError: retencja = self.controller.settings.get('desired_retention')
+        if self.controller.set_scheduler(nazwa, retencja) and messagebox.askyesno("Algorytm powtórek", "Przeliczyć terminy kart we wszystkich przedmiotach według nowych ustawień?"):
+            self.przelicz_talie()
+        self.controller.show_frame("WelcomeScreen")
+    def przelicz_talie(self):
+        storage, planista = self.controller.storage, self.controller.planista
+        def przelicz(): return sum(storage.reschedule(deck, planista) for deck in storage.list_decks())
+        self.controller.io.submit(przelicz, on_done=lambda liczba: messagebox.showinfo("Algorytm powtórek", f"Przeliczono terminy {liczba} kart."))
     def on_show(self, *args):
-        self.theme_var.set(self.controller.settings.get('theme')); self.sound_var.set(self.controller.settings.get('sound_enabled'))
-        self.timer_var.set(self.controller.settings.get('timer_duration'))
+        self.theme_var.set(self.controller.settings.get('theme')); self.sound_var.set(self.controller.settings.get('sound_enabled')); self.animation_var.set(self.controller.settings.get('flip_animation'))
+        self.timer_var.set(self.controller.settings.get('timer_duration')); self.new_limit_var.set(self.controller.settings.get('new_cards_per_day'))
+        self.new_spacing_var.set(self.controller.settings.get('new_card_spacing')); self.storage_var.set(self.controller.settings.get('storage_backend'))
+        self.scheduler_var.set(self.controller.planista.opis); self.retention_var.set(self.controller.settings.get('desired_retention'))
     def update_theme(self): pass
 
 class DeckEditor(ttk.Frame):
@@ -512,98 +839,332 @@ class DeckEditor(ttk.Frame):
         ttk.Button(btn_frame, text="+ Nowy", command=self.stworz_nowy_przedmiot).pack(fill='x')
         ttk.Button(btn_frame, text="- Usuń", command=self.usun_przedmiot, style='Danger.TButton').pack(fill='x', pady=2)
         right_frame = ttk.Frame(main_frame, style='Card.TFrame', padding=10); right_frame.pack(side='right', fill='both', expand=True)
-        ttk.Label(right_frame, text="Pytania w przedmiocie", style='Card.Header.TLabel').pack()
-        self.card_listbox = Listbox(right_frame, relief='flat', borderwidth=0)
+        self.karty_label = ttk.Label(right_frame, text="Pytania w przedmiocie", style='Card.Header.TLabel'); self.karty_label.pack()
+        self.search_var = tk.StringVar(); self.search_var.trace_add('write', lambda *args: self.filtruj_karty())
+        search_frame = ttk.Frame(right_frame, style='Card.TFrame'); search_frame.pack(fill='x')
+        ttk.Label(search_frame, text="🔍", style='Card.TLabel').pack(side='left'); ttk.Entry(search_frame, textvariable=self.search_var).pack(side='left', fill='x', expand=True, padx=5)
+        self.karty_w_przedmiocie = []; self.id_kart = []; self.doc_ids = []; self.widoczne = None; self.indeks = IndeksWyszukiwania()
+        self.selected_deck = None; self.zmiany_oczekujace = False; self.zapis_id = None; self.postep_importu = None; self.wczytywanie = False; self.nastepny_doc_id = 0
+        self.card_listbox = VirtualList(right_frame)
         self.card_listbox.pack(fill='both', expand=True, pady=5)
         card_btn_frame = ttk.Frame(right_frame, style='Card.TFrame'); card_btn_frame.pack(fill='x', pady=5)
         ttk.Button(card_btn_frame, text="+ Dodaj", command=self.dodaj_karte).pack(side='left')
         ttk.Button(card_btn_frame, text="✎ Edytuj", command=self.edytuj_karte).pack(side='left', padx=5)
         ttk.Button(card_btn_frame, text="- Usuń", command=self.usun_karte, style='Danger.TButton').pack(side='left')
+        ttk.Button(card_btn_frame, text="⇪ Importuj z pliku", command=self.importuj_plik).pack(side='right')
         self.update_theme()
     def update_theme(self):
         theme = self.controller.theme
         for lb in [self.deck_listbox, self.card_listbox]: lb.config(bg=theme['frame_bg'], fg=theme['fg'], selectbackground=theme['highlight'])
     def on_show(self, *args): self.odswiez_liste_przedmiotow()
+    def on_hide(self): self.zapisz_biezacy_przedmiot()
     def odswiez_liste_przedmiotow(self):
-        self.deck_listbox.delete(0, 'end')
-        przedmioty = [f.replace('.txt', '') for f in os.listdir(FOLDER_PRZEDMIOTOW) if f.endswith('.txt')]
-        for przedmiot in przedmioty: self.deck_listbox.insert('end', przedmiot)
-        self.card_listbox.delete(0, 'end')
+        self.zapisz_biezacy_przedmiot()
+        self.deck_listbox.delete(0, 'end'); self.card_listbox.delete(0, 'end')
+        def pokaz(przedmioty):
+            self.deck_listbox.delete(0, 'end')
+            for przedmiot in przedmioty: self.deck_listbox.insert('end', przedmiot)
+        self.controller.io.submit(self.controller.storage.list_decks, on_done=pokaz)
     def wyswietl_karty_przedmiotu(self, event=None):
         if not self.deck_listbox.curselection(): return
+        self.zapisz_biezacy_przedmiot()
         self.card_listbox.delete(0, 'end')
-        self.selected_deck = self.deck_listbox.get(self.deck_listbox.curselection())
-        plik_przedmiotu = os.path.join(FOLDER_PRZEDMIOTOW, f"{self.selected_deck}.txt")
-        if os.path.exists(plik_przedmiotu):
-            with open(plik_przedmiotu, 'r', encoding='utf-8') as f:
-                self.karty_w_przedmiocie = [line.strip() for line in f if line.strip()]
-            for karta in self.karty_w_przedmiocie: self.card_listbox.insert('end', karta)
+        self.selected_deck = deck = self.deck_listbox.get(self.deck_listbox.curselection())
+        self.karty_w_przedmiocie = []; self.id_kart = []; self.doc_ids = []; self.widoczne = None; self.indeks = IndeksWyszukiwania()
+        self.wczytaj_karty(deck)
+    def wczytaj_karty(self, deck):
+        # Do czasu pokaz_karty listy są puste - edycja i zapis są zablokowane, inaczej zapis nadpisałby talię jedną kartą.
+        # Po błędzie wczytywania blokada zostaje do wyboru innego przedmiotu.
+        self.wczytywanie = True; self.karty_label.config(text="⏳ Wczytywanie pytań...")
+        def blad(exc):
+            if self.selected_deck == deck: self.karty_label.config(text=f"Błąd wczytywania: {exc}")
+        self.controller.io.submit(self.controller.storage.load_deck, deck, on_done=lambda talia: self.pokaz_karty(deck, talia), on_error=blad)
+    def pokaz_karty(self, deck, talia):
+        if self.selected_deck != deck: return  # w międzyczasie wybrano inny przedmiot
+        self.wczytywanie = False
+        # id_kart idą równolegle z pytaniami - edycja treści zachowuje id (i postęp), usunięcie zabiera je razem z pytaniem.
+        self.karty_label.config(text="Pytania w przedmiocie"); self.id_kart, self.karty_w_przedmiocie = talia
+        # doc_ids rosną razem z pozycją, więc kolejność id w indeksie odpowiada kolejności pytań w talii.
+        self.doc_ids = list(range(len(self.karty_w_przedmiocie))); self.nastepny_doc_id = len(self.doc_ids)
+        self.indeks = IndeksWyszukiwania()
+        for doc_id, pytanie in zip(self.doc_ids, self.karty_w_przedmiocie): self.indeks.dodaj(doc_id, pytanie)
+        self.filtruj_karty()
+    def filtruj_karty(self):
+        trafienia = self.indeks.szukaj(self.search_var.get())
+        if trafienia is None:
+            self.widoczne = None; self.card_listbox.set_items(len(self.karty_w_przedmiocie), self.karty_w_przedmiocie.__getitem__); return
+        self.widoczne = [bisect.bisect_left(self.doc_ids, doc_id) for doc_id in sorted(trafienia)]
+        self.card_listbox.set_items(len(self.widoczne), lambda i: self.karty_w_przedmiocie[self.widoczne[i]])
+    def zaznaczona_pozycja(self):
+        if not self.card_listbox.curselection(): return None
+        wiersz = self.card_listbox.curselection()[0]
+        return wiersz if self.widoczne is None else self.widoczne[wiersz]
     def stworz_nowy_przedmiot(self):
         nazwa = simpledialog.askstring("Nowy Przedmiot", "Podaj nazwę nowego przedmiotu:", parent=self)
         if nazwa and nazwa.strip():
-            with open(os.path.join(FOLDER_PRZEDMIOTOW, f"{nazwa}.txt"), 'w', encoding='utf-8') as f: pass
-            self.odswiez_liste_przedmiotow()
+            self.controller.io.submit(self.controller.storage.create_deck, nazwa, on_done=lambda _: self.odswiez_liste_przedmiotow())
     def usun_przedmiot(self):
         if not self.deck_listbox.curselection(): return
         nazwa = self.deck_listbox.get(self.deck_listbox.curselection())
         if messagebox.askyesno("Potwierdzenie", f"Czy na pewno chcesz usunąć przedmiot '{nazwa}' i jego postęp?"):
-            plik_przedmiotu_path = os.path.join(FOLDER_PRZEDMIOTOW, f"{nazwa}.txt")
-            if os.path.exists(plik_przedmiotu_path): os.remove(plik_przedmiotu_path)
-            plik_postepu = f"{PLIK_POSTEPU_PREFIX}{nazwa}.json"
-            if os.path.exists(plik_postepu): os.remove(plik_postepu)
-            self.odswiez_liste_przedmiotow()
+            if nazwa == self.selected_deck: self.anuluj_zapis(); self.selected_deck = None
+            self.controller.io.submit(self.controller.storage.delete_deck, nazwa, on_done=lambda _: self.odswiez_liste_przedmiotow())
+    def edycja_zablokowana(self):
+        # Edycja listy w trakcie importu nadpisałaby zaimportowane pytania przy zapisie talii, a w trakcie wczytywania - całą talię.
+        if self.postep_importu is not None: messagebox.showinfo("Import", "Poczekaj na zakończenie importu."); return True
+        if self.wczytywanie: messagebox.showinfo("Wczytywanie", "Poczekaj na wczytanie pytań przedmiotu."); return True
+        return False
+    def importuj_plik(self):
+        if not self.selected_deck: messagebox.showerror("Błąd", "Najpierw wybierz przedmiot z listy."); return
+        if self.edycja_zablokowana(): return
+        sciezka = filedialog.askopenfilename(parent=self, title="Importuj pytania", filetypes=[("CSV / TSV / tekst", "*.csv *.tsv *.txt"), ("Wszystkie pliki", "*.*")])
+        if not sciezka: return
+        self.zapisz_biezacy_przedmiot()  # oczekujące edycje trafiają do kolejki I/O przed importem
+        deck = self.selected_deck; self.postep_importu = (0, 0, 0, 0)
+        def postep(*stan): self.postep_importu = stan  # wołane z wątku I/O - tylko podmiana krotki, widżety odświeża after()
+        def koniec():
+            self.postep_importu = None; self.karty_label.config(text="Pytania w przedmiocie")
+            if self.selected_deck == deck: self.wczytaj_karty(deck)
+        def gotowe(wynik):
+            koniec(); messagebox.showinfo("Import", f"Dodano {wynik['dodane']} pytań, pominięto {wynik['pominiete']} duplikatów.")
+        def blad(exc): koniec(); messagebox.showerror("Błąd importu", str(exc))
+        self.controller.io.submit(importuj_strumieniowo, self.controller.storage, deck, sciezka, None, 0, postep, on_done=gotowe, on_error=blad)
+        self.pokaz_postep_importu()
+    def pokaz_postep_importu(self):
+        if self.postep_importu is None: return
+        bajty, rozmiar, dodane, pominiete = self.postep_importu
+        self.karty_label.config(text=f"⏳ Import: {bajty * 100 // rozmiar if rozmiar else 0}% - dodano {dodane}, pominięto {pominiete}")
+        self.after(100, self.pokaz_postep_importu)
     def dodaj_karte(self):
-        if not hasattr(self, 'selected_deck') or not self.selected_deck: messagebox.showerror("Błąd", "Najpierw wybierz przedmiot z listy."); return
+        if self.edycja_zablokowana(): return
+        if not self.selected_deck: messagebox.showerror("Błąd", "Najpierw wybierz przedmiot z listy."); return
         pytanie = simpledialog.askstring("Nowe pytanie", "Wpisz treść pytania:", parent=self)
         if pytanie and pytanie.strip():
-            self.karty_w_przedmiocie.append(pytanie)
-            self.zapisz_biezacy_przedmiot()
+            self.karty_w_przedmiocie.append(pytanie.strip()); self.id_kart.append(nowe_id()); doc_id = self.nastepny_doc_id; self.nastepny_doc_id += 1
+            self.doc_ids.append(doc_id); self.indeks.dodaj(doc_id, pytanie)
+            if self.widoczne is None: self.card_listbox.refresh(len(self.karty_w_przedmiocie)); self.card_listbox.selection_set(len(self.karty_w_przedmiocie) - 1)
+            elif self.indeks.pasuje(doc_id, self.search_var.get()): self.widoczne.append(len(self.karty_w_przedmiocie) - 1); self.card_listbox.refresh(len(self.widoczne)); self.card_listbox.selection_set(len(self.widoczne) - 1)
+            self.zaplanuj_zapis()
     def edytuj_karte(self):
-        if not self.card_listbox.curselection(): return
-        index = self.card_listbox.curselection()[0]; stare_pytanie = self.karty_w_przedmiocie[index]
+        index = self.zaznaczona_pozycja()
+        if index is None or self.edycja_zablokowana(): return
+        stare_pytanie = self.karty_w_przedmiocie[index]
         nowe_pytanie = simpledialog.askstring("Edytuj pytanie", "Popraw treść pytania:", initialvalue=stare_pytanie, parent=self)
         if nowe_pytanie and nowe_pytanie.strip():
-            self.karty_w_przedmiocie[index] = nowe_pytanie
-            self.zapisz_biezacy_przedmiot()
+            self.karty_w_przedmiocie[index] = nowe_pytanie.strip(); self.indeks.zmien(self.doc_ids[index], nowe_pytanie)
+            if self.widoczne is not None and not self.indeks.pasuje(self.doc_ids[index], self.search_var.get()):
+                self.widoczne.remove(index); self.card_listbox.selection_clear()
+            self.card_listbox.refresh(len(self.karty_w_przedmiocie) if self.widoczne is None else len(self.widoczne))
+            self.zaplanuj_zapis()
     def usun_karte(self):
-        if not self.card_listbox.curselection(): return
-        index = self.card_listbox.curselection()[0]
+        index = self.zaznaczona_pozycja()
+        if index is None or self.edycja_zablokowana(): return
         if messagebox.askyesno("Potwierdzenie", "Czy na pewno chcesz usunąć to pytanie?"):
-            del self.karty_w_przedmiocie[index]
-            self.zapisz_biezacy_przedmiot()
+            self.indeks.usun(self.doc_ids[index])
+            del self.karty_w_przedmiocie[index]; del self.id_kart[index]; del self.doc_ids[index]
+            if self.widoczne is not None: self.widoczne = [p - 1 if p > index else p for p in self.widoczne if p != index]
+            self.card_listbox.selection_clear(); self.card_listbox.refresh(len(self.karty_w_przedmiocie) if self.widoczne is None else len(self.widoczne))
+            self.zaplanuj_zapis()
+    def zaplanuj_zapis(self):
+        # Zmiany zbierane są w pamięci; plik talii zapisywany jest raz, po chwili bezczynności albo przy wyjściu z ekranu.
+        self.zmiany_oczekujace = True
+        if self.zapis_id: self.after_cancel(self.zapis_id)
+        self.zapis_id = self.after(ZAPIS_TALII_OPOZNIENIE_MS, self.zapisz_biezacy_przedmiot)
+    def anuluj_zapis(self):
+        if self.zapis_id: self.after_cancel(self.zapis_id); self.zapis_id = None
+        self.zmiany_oczekujace = False
     def zapisz_biezacy_przedmiot(self):
-        plik_przedmiotu = os.path.join(FOLDER_PRZEDMIOTOW, f"{self.selected_deck}.txt")
-        with open(plik_przedmiotu, 'w', encoding='utf-8') as f:
-            for karta in self.karty_w_przedmiocie: f.write(karta + '\n')
-        self.wyswietl_karty_przedmiotu()
+        if self.wczytywanie: return  # listy w pamięci nie są jeszcze talią - nie ma czego zapisać
+        zmiany = self.zmiany_oczekujace; self.anuluj_zapis()
+        # Kopia listy - edycja może trwać dalej, zanim wątek I/O skończy zapis.
+        if zmiany and self.selected_deck: self.controller.io.submit(self.controller.storage.save_questions, self.selected_deck, list(self.karty_w_przedmiocie), list(self.id_kart))
+
+class DashboardScreen(ttk.Frame):
+    # Przegląd wszystkich talii. Podsumowania liczy magazyn (cache + pula procesów / jedno zapytanie SQL);
+    # podczas wyświetlania ekran odświeża się co PRZEGLAD_ODSWIEZANIE_MS, zmieniając tylko wiersze, które się zmieniły.
+    KOLUMNY = (('new', "Nowe"), ('learning', "W nauce"), ('young', "Młode"), ('mature', "Dojrzałe"), ('due_today', "Dziś do powtórki"))
+    def __init__(self, parent, controller):
+        super().__init__(parent); self.controller = controller; self.odswiez_id = None; self.widoczny = False
+        top_frame = ttk.Frame(self); top_frame.pack(fill='x', padx=10, pady=10)
+        self.title_label = ttk.Label(top_frame, text="Wszystkie przedmioty", style='Title.TLabel'); self.title_label.pack(side='left')
+        ttk.Button(top_frame, text="← Wróć", command=lambda: controller.show_frame("WelcomeScreen")).pack(side='right')
+        self.tabela = ttk.Treeview(self, columns=[k for k, _ in self.KOLUMNY], show='tree headings')
+        self.tabela.heading('#0', text="Przedmiot"); self.tabela.column('#0', width=300)
+        for klucz, naglowek in self.KOLUMNY: self.tabela.heading(klucz, text=naglowek); self.tabela.column(klucz, width=110, anchor='e')
+        self.tabela.pack(fill='both', expand=True, padx=20, pady=10)
+        self.tabela.bind('<Double-1>', self.pokaz_statystyki)
+        self.razem_label = ttk.Label(self, text="", style='Subtitle.TLabel'); self.razem_label.pack(anchor='w', padx=20, pady=(0, 15))
+    def on_show(self, *args):
+        self.widoczny = True
+        if not self.tabela.get_children(): self.title_label.config(text="Wszystkie przedmioty ⏳")
+        self.odswiez()
+    def on_hide(self):
+        self.widoczny = False
+        if self.odswiez_id: self.after_cancel(self.odswiez_id); self.odswiez_id = None
+    def odswiez(self):
+        self.odswiez_id = None; storage = self.controller.storage
+        def zbierz(): return storage.overview(sorted(storage.list_decks()))
+        self.controller.io.submit(zbierz, on_done=self.pokaz)
+    def pokaz(self, przeglad):
+        if not self.widoczny: return
+        self.title_label.config(text="Wszystkie przedmioty"); razem = Counter()
+        for deck_name in set(self.tabela.get_children()) - set(przeglad): self.tabela.delete(deck_name)
+        for i, (deck_name, summary) in enumerate(przeglad.items()):
+            razem.update(summary); wartosci = tuple(summary.get(k, 0) for k, _ in self.KOLUMNY)
+            if not self.tabela.exists(deck_name): self.tabela.insert('', i, iid=deck_name, text=deck_name, values=wartosci)
+            elif tuple(int(v) for v in self.tabela.item(deck_name, 'values')) != wartosci: self.tabela.item(deck_name, values=wartosci)
+        self.razem_label.config(text=f"Razem ({len(przeglad)} przedmiotów): " + ", ".join(f"{naglowek.lower()} {razem[k]}" for k, naglowek in self.KOLUMNY))
+        self.odswiez_id = self.after(PRZEGLAD_ODSWIEZANIE_MS, self.odswiez)
+    def pokaz_statystyki(self, event=None):
+        deck_name = self.tabela.focus()
+        if deck_name: self.controller.show_frame('StatsScreen', deck_name)
+    def update_theme(self): pass
 
-class AnimatedCard(ttk.Frame):
+class DiagnosticsScreen(ttk.Frame):
+    # Ukryty ekran (Ctrl+Shift+D): statystyki z bufora profilera i zrzut pomiarów do pliku.
+    KOLUMNY = (('kategoria', "Kategoria", 90), ('nazwa', "Operacja", 300), ('liczba', "Liczba", 70), ('srednia_ms', "Średnio [ms]", 100),
+               ('p50_ms', "p50 [ms]", 90), ('p95_ms', "p95 [ms]", 90), ('max_ms', "Max [ms]", 90))
+    def __init__(self, parent, controller):
+        super().__init__(parent); self.controller = controller; self.return_screen = "WelcomeScreen"
+        top_frame = ttk.Frame(self); top_frame.pack(fill='x', padx=10, pady=10)
+        ttk.Label(top_frame, text="Diagnostyka", style='Title.TLabel').pack(side='left')
+        ttk.Button(top_frame, text="← Wróć", command=lambda: controller.show_frame(self.return_screen)).pack(side='right')
+        self.status_label = ttk.Label(self, text="", style='Subtitle.TLabel'); self.status_label.pack(anchor='w', padx=20)
+        self.tabela = ttk.Treeview(self, columns=[k for k, _, _ in self.KOLUMNY], show='headings')
+        for klucz, naglowek, szerokosc in self.KOLUMNY: self.tabela.heading(klucz, text=naglowek); self.tabela.column(klucz, width=szerokosc, anchor='w' if klucz in ('kategoria', 'nazwa') else 'e')
+        self.tabela.pack(fill='both', expand=True, padx=20, pady=10)
+        btn_frame = ttk.Frame(self); btn_frame.pack(fill='x', padx=20, pady=(0, 10))
+        ttk.Button(btn_frame, text="⟳ Odśwież", command=self.odswiez).pack(side='left')
+        ttk.Button(btn_frame, text="💾 Zapisz do pliku", command=self.zrzuc, style='Accent.TButton').pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Wyczyść", command=lambda: (self.controller.profiler.wyczysc(), self.odswiez()), style='Danger.TButton').pack(side='left')
+    def on_show(self, return_screen="WelcomeScreen"):
+        if return_screen != "DiagnosticsScreen": self.return_screen = return_screen
+        self.odswiez()
+    def odswiez(self):
+        profiler = self.controller.profiler; self.tabela.delete(*self.tabela.get_children())
+        if not profiler.aktywny: self.status_label.config(text='Profilowanie wyłączone - ustaw "profiling_enabled": true w settings.json i uruchom ponownie.'); return
+        self.status_label.config(text=f"Pomiarów w buforze: {len(profiler.bufor)} / {profiler.bufor.maxlen}")
+        for wiersz in profiler.statystyki(): self.tabela.insert('', 'end', values=[f"{wiersz[k]:.2f}" if k.endswith('_ms') else wiersz[k] for k, _, _ in self.KOLUMNY])
+    def zrzuc(self):
+        sciezka = f"profil_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        try: self.controller.profiler.zrzuc(sciezka); messagebox.showinfo("Diagnostyka", f"Zapisano pomiary do pliku {sciezka}.")
+        except OSError as e: messagebox.showerror("Błąd", f"Nie udało się zapisać pliku: {e}")
+    def update_theme(self): pass
+
+class AnimatedCard(tk.Canvas):
+    # Karta rysowana na Canvas: prostokąt tła i jeden element tekstowy, zawijany tylko przy zmianie treści.
+    # Obrót zmienia wyłącznie współrzędne prostokąta, a skala liczona jest z upływu czasu - spóźnione klatki są pomijane,
+    # więc animacja zawsze trwa CZAS_OBROTU_MS niezależnie od szybkości maszyny.
+    CZAS_OBROTU_MS = 300; KLATKA_MS = 15; ZAWIJANIE = 700
     def __init__(self, parent, **kwargs):
-        super().__init__(parent, **kwargs); self.parent = parent; self.animation_in_progress = False; self.front_content = None; self.on_flip_complete = None
-    def set_content(self, front_widget):
-        self.front_content = front_widget; self.front_content.pack(fill='both', expand=True, padx=20, pady=20)
-    def flip(self, on_complete=None):
+        super().__init__(parent, highlightthickness=0, **kwargs); self.animation_in_progress = False; self.on_flip_complete = None; self.animacja_id = None
+        self.profiler = getattr(self.winfo_toplevel(), 'profiler', None) or Profiler(); self.ostatnia_klatka = None
+        self.szerokosc = self.wysokosc = 1; self.tekst_widoczny = True
+        self.tlo = self.create_rectangle(0, 0, 0, 0, width=0)
+        self.tekst = self.create_text(0, 0, text="", font=('Segoe UI Semibold', 24), justify='center', width=self.ZAWIJANIE)
+        self.bind('<Configure>', self._zmiana_rozmiaru)
+    def update_theme(self, theme):
+        self.config(bg=theme['bg']); self.itemconfig(self.tlo, fill=theme['frame_bg']); self.itemconfig(self.tekst, fill=theme['fg'])
+    def set_text(self, tekst):
+        if self.itemcget(self.tekst, 'text') != tekst: self.itemconfig(self.tekst, text=tekst)
+    def _zmiana_rozmiaru(self, event):
+        self.szerokosc, self.wysokosc = event.width, event.height; self.coords(self.tekst, event.width / 2, event.height / 2)
+        if not self.animation_in_progress: self._rysuj(1.0)
+    def _rysuj(self, skala):
+        srodek = self.szerokosc / 2; self.coords(self.tlo, srodek * (1 - skala), 0, srodek * (1 + skala), self.wysokosc)
+        if self.tekst_widoczny != (skala >= 1.0):  # tekst ukryty na czas obrotu - bez ponownego zawijania w każdej klatce
+            self.tekst_widoczny = skala >= 1.0; self.itemconfig(self.tekst, state='normal' if self.tekst_widoczny else 'hidden')
+    def flip(self, on_complete=None, animacja=True):
         if self.animation_in_progress: return
-        self.animation_in_progress = True; self.on_flip_complete = on_complete
-        if not hasattr(self, 'start_width') or self.winfo_width() == 1: self.start_width = self.master.winfo_width()
-        self._animate_flip_out()
-    def _animate_flip_out(self, step=0):
-        if step < 10:
-            scale = 1.0 - (step + 1) / 10.0
-            self.place(relx=0.5, rely=0.5, anchor="center", relwidth=scale, relheight=1.0)
-            self.parent.after(15, lambda: self._animate_flip_out(step + 1))
-        else: self._animate_flip_in()
-    def _animate_flip_in(self, step=0):
-        if step < 10:
-            scale = (step + 1) / 10.0
-            self.place(relx=0.5, rely=0.5, anchor="center", relwidth=scale, relheight=1.0)
-            self.parent.after(15, lambda: self._animate_flip_in(step + 1))
-        else:
-            self.place(relx=0.5, rely=0.5, anchor="center", relwidth=1.0, relheight=1.0)
-            self.animation_in_progress = False
-            if self.on_flip_complete: self.on_flip_complete()
+        if not animacja:
+            if on_complete: on_complete()
+            return
+        self.animation_in_progress = True; self.on_flip_complete = on_complete; self.start_flip = time.perf_counter(); self.ostatnia_klatka = None
+        self._animuj()
+    def _klatka(self):
+        # Rzeczywisty odstęp między klatkami animacji (zamówione KLATKA_MS).
+        teraz = time.perf_counter()
+        if self.ostatnia_klatka is not None: self.profiler.zapisz('animacja', 'odstęp klatek flip', (teraz - self.ostatnia_klatka) * 1000)
+        self.ostatnia_klatka = teraz
+    def _animuj(self):
+        self._klatka(); postep = (time.perf_counter() - self.start_flip) * 1000 / self.CZAS_OBROTU_MS
+        if postep < 1.0: self._rysuj(abs(1.0 - 2.0 * postep)); self.animacja_id = self.after(self.KLATKA_MS, self._animuj); return
+        self.animacja_id = None; self.animation_in_progress = False; self._rysuj(1.0)
+        self.profiler.zapisz('animacja', 'flip', (time.perf_counter() - self.start_flip) * 1000)
+        if self.on_flip_complete: self.on_flip_complete()
     def reset(self):
-        self.place(relx=0.5, rely=0.5, anchor="center", relwidth=1.0, relheight=1.0)
+        if self.animacja_id: self.after_cancel(self.animacja_id); self.animacja_id = None
+        self.animation_in_progress = False; self._rysuj(1.0)
+
+class VirtualList(ttk.Frame):
+    # Lista wirtualna zgodna z podzbiorem API Listbox: rysuje tylko widoczne wiersze z puli elementów Canvas,
+    # a tekst i kolory pobiera na żądanie - koszt otwarcia nie zależy od liczby kart.
+    def __init__(self, parent, row_font=('Segoe UI', 10), **kwargs):
+        super().__init__(parent, **kwargs)
+        self.row_font = row_font; self.row_height = font.Font(font=row_font).metrics('linespace') + 6
+        self.count = 0; self.text_for = lambda i: ''; self.colors_for = None; self.top = 0; self.selected = None; self.rows = []
+        self.colors = {'bg': '#ffffff', 'fg': '#000000', 'selectbackground': '#0078d4', 'selectforeground': '#ffffff'}
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.yview); self.scrollbar.pack(side='right', fill='y')
+        self.canvas = tk.Canvas(self, highlightthickness=0, borderwidth=0, takefocus=1); self.canvas.pack(side='left', fill='both', expand=True)
+        self.canvas.bind('<Configure>', lambda e: self.redraw()); self.canvas.bind('<Button-1>', self._on_click)
+        self.canvas.bind('<MouseWheel>', lambda e: self.yview('scroll', -1 if e.delta > 0 else 1, 'units'))
+        self.canvas.bind('<Button-4>', lambda e: self.yview('scroll', -1, 'units')); self.canvas.bind('<Button-5>', lambda e: self.yview('scroll', 1, 'units'))
+        self.canvas.bind('<Up>', lambda e: self._move_selection(-1)); self.canvas.bind('<Down>', lambda e: self._move_selection(1))
+    def config(self, **options):
+        for key in ('bg', 'fg', 'selectbackground', 'selectforeground'):
+            if key in options: self.colors[key] = options.pop(key)
+        self.canvas.config(bg=self.colors['bg'])
+        if options: super().config(**options)
+        self.redraw()
+    configure = config
+    def set_items(self, count, text_for, colors_for=None):
+        self.count = count; self.text_for = text_for; self.colors_for = colors_for; self.top = 0; self.selected = None; self.redraw()
+    def delete(self, first, last=None): self.set_items(0, lambda i: '')
+    def refresh(self, count=None):
+        # Odświeża tylko widoczne wiersze po zmianie danych źródłowych; przewinięcie zostaje zachowane.
+        if count is not None: self.count = count
+        if self.selected is not None and self.selected >= self.count: self.selected = None
+        self._clamp(); self.redraw()
+    def selection_clear(self, *args): self.selected = None; self.redraw()
+    def get(self, index): return self.text_for(index)
+    def size(self): return self.count
+    def curselection(self): return (self.selected,) if self.selected is not None else ()
+    def selection_set(self, index): self.selected = index; self.see(index); self.redraw()
+    def see(self, index):
+        height = self.canvas.winfo_height(); y = index * self.row_height
+        if y < self.top: self.top = y
+        elif y + self.row_height > self.top + height: self.top = y + self.row_height - height
+        self._clamp()
+    def _clamp(self): self.top = max(0, min(self.top, self.count * self.row_height - self.canvas.winfo_height()))
+    def yview(self, *args):
+        total = max(1, self.count * self.row_height)
+        if not args: return (self.top / total, min(1.0, (self.top + self.canvas.winfo_height()) / total))
+        if args[0] == 'moveto': self.top = int(float(args[1]) * total)
+        elif args[0] == 'scroll': self.top += int(args[1]) * (self.row_height if args[2] == 'units' else self.canvas.winfo_height())
+        self._clamp(); self.redraw()
+    def redraw(self):
+        height = self.canvas.winfo_height(); width = self.canvas.winfo_width(); needed = height // self.row_height + 2
+        while len(self.rows) < needed:
+            self.rows.append((self.canvas.create_rectangle(0, 0, 0, 0, width=0), self.canvas.create_text(0, 0, anchor='w', font=self.row_font)))
+        first = self.top // self.row_height; offset = first * self.row_height - self.top
+        for i, (rect, text) in enumerate(self.rows):
+            index = first + i
+            if i >= needed or index >= self.count:
+                self.canvas.itemconfigure(rect, state='hidden'); self.canvas.itemconfigure(text, state='hidden'); continue
+            if index == self.selected: bg, fg = self.colors['selectbackground'], self.colors['selectforeground']
+            elif self.colors_for: bg, fg = self.colors_for(index)
+            else: bg, fg = self.colors['bg'], self.colors['fg']
+            y = offset + i * self.row_height
+            self.canvas.coords(rect, 0, y, width, y + self.row_height); self.canvas.itemconfigure(rect, fill=bg, state='normal')
+            self.canvas.coords(text, 6, y + self.row_height / 2); self.canvas.itemconfigure(text, text=self.text_for(index), fill=fg, state='normal')
+        self.scrollbar.set(*self.yview())
+    def _select(self, index):
+        if not 0 <= index < self.count: return
+        self.selected = index; self.see(index); self.redraw(); self.event_generate('<<ListboxSelect>>')
+    def _on_click(self, event): self.canvas.focus_set(); self._select((self.top + event.y) // self.row_height)
+    def _move_selection(self, delta): self._select(0 if self.selected is None else self.selected + delta)
+
+mojaNaukaApp.EKRANY = {F.__name__: F for F in (WelcomeScreen, StudyScreen, DeckEditor, StatsScreen, BrowseScreen, SettingsScreen, DashboardScreen, DiagnosticsScreen)}
 
 if __name__ == "__main__":
     app = mojaNaukaApp()
@@ -0,0 +1,920 @@
+# mojaNauka - silnik SRS bez GUI: model kart, harmonogram, magazyny danych i wiersz poleceń.
+# Użycie: python silnik.py {decks,due,review,summary,import,maintain} --help
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import uuid
+import time
+import enum
+import sqlite3
+import threading
+import shutil
+import heapq
+import itertools
+import multiprocessing
+import struct
+import bisect
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque, defaultdict
+from datetime import datetime, timedelta
+import math
+import mmap
+
+try: import numpy as np  # opcjonalne - analizy w StatsScreen mają odpowiednik w czystym Pythonie
+except ImportError: np = None
+
+FOLDER_PRZEDMIOTOW = "decks"
+PLIK_POSTEPU_PREFIX = "progress_"
+PLIK_DZIENNIKA_SUFFIX = ".journal"
+PLIK_ID_SUFFIX = ".ids"
+PLIK_HISTORII_SUFFIX = ".history"
+PLIK_BINARNY_SUFFIX = ".bin"
+PLIK_STAREGO_POSTEPU = "postep.json"  # pierwsze wersje: jedna talia, pola text/status
+PLIK_BAZY = "mojanauka.db"
+DZIENNIK_PROG_KOMPAKCJI = 500
+IMPORT_PARTIA = 5000
+PRZEGLAD_PROG_PULI = 8  # od tylu talii do przeliczenia opłaca się start puli procesów
+PODSUMOWANIE_NIEPOTWIERDZONE_S = 10.0  # jak długo ufamy podsumowaniu z put(), zanim zapis w tle potwierdzi je przez stamp()
+
+SRS_INTERVALS = {
+    'again': timedelta(minutes=1), 'hard': timedelta(minutes=10),
+    'good_initial': timedelta(days=1), 'easy_initial': timedelta(days=4),
+    'good_factor': 2.5, 'easy_factor_bonus': 1.3
+}
+SRS_MATURITY_THRESHOLD = timedelta(days=21)
+SESJA_HORYZONT_NAUKI = timedelta(minutes=20)
+POLA_STANU_KARTY = ('status', 'interval', 'due', 'ease', 'stability', 'difficulty')
+POLA_PRZELICZANE = ('due', 'interval', 'ease', 'stability', 'difficulty')  # kolumny wejścia i wyniku Planista.przelicz
+RETENCJA_DOCELOWA = 0.9
+OCENY = ('again', 'hard', 'good', 'easy')
+DZIEN = 86400.0
+# Historia ocen: rekordy stałej długości - czas, indeks w OCENY (OCENA_COFNIETA = cofnięcie oceny z tym samym czasem),
+# status przed oceną, interwał przed i po (w dniach).
+REKORD_HISTORII = struct.Struct('<dBBff')
+OCENA_COFNIETA = 255
+HORYZONT_PROGNOZY = 365
+PRZEDZIALY_INTERWALOW = (0, 1, 3, 7, 14, 30, 60, 90, 180, 365)  # dni, ostatni przedział otwarty
+PROBY_ODCZYTU_POSTEPU = 3  # ile razy ponawiamy odczyt postępu, gdy zapis w tle podmieni pliki w trakcie
+# Binarny snapshot postępu (backend 'binary'): nagłówek + rekordy stałej długości bez treści pytań - id (ASCII, do 36 znaków),
+# status, termin, interwał i stan planisty. Wczytywany przez mmap, bez parsowania tekstu.
+NAGLOWEK_POSTEPU = struct.Struct('<4sHI'); MAGIA_POSTEPU = b'MNP1'
+REKORD_POSTEPU = struct.Struct('<36sBddfff')
+if np is not None: TYP_HISTORII = np.dtype([('ts', '<f8'), ('ocena', 'u1'), ('status', 'u1'), ('przed', '<f4'), ('po', '<f4')])
+
+class StatusKarty(enum.IntEnum):
+    NEW = 0; LEARNING = 1; REVIEW = 2
+    @property
+    def tekst(self): return self.name.lower()
+    @classmethod
+    def z_tekstu(cls, tekst): return cls.__members__.get(str(tekst).upper(), cls.NEW)
+
+class Karta:
+    # Zwarta karta w pamięci: termin jako epoch (float), status jako IntEnum. Stan planisty (ease dla SM-2,
+    # stability/difficulty dla FSRS) trafia do JSON tylko wtedy, gdy jest ustawiony - pliki klasycznego planisty się nie zmieniają.
+    __slots__ = ('id', 'pytanie', 'status', 'due', 'interval', 'ease', 'stability', 'difficulty')
+    def __init__(self, id, pytanie, status=StatusKarty.NEW, due=0.0, interval=0.0, ease=0.0, stability=0.0, difficulty=0.0):
+        self.id = id; self.pytanie = pytanie; self.status = status; self.due = due; self.interval = interval
+        self.ease = ease; self.stability = stability; self.difficulty = difficulty
+    @classmethod
+    def nowa(cls, pytanie, id=None): return cls(id or nowe_id(), pytanie, StatusKarty.NEW, time.time(), 0.0)
+    @classmethod
+    def z_json(cls, d):
+        try: due = datetime.fromisoformat(d['due_date']).timestamp()
+        except (KeyError, TypeError, ValueError): due = time.time()
+        return cls(d.get('id') or nowe_id(), d['pytanie'], StatusKarty.z_tekstu(d.get('status')), due, float(d.get('interval') or 0),
+                   float(d.get('ease') or 0), float(d.get('stability') or 0), float(d.get('difficulty') or 0))
+    def stan(self): return (self.id, self.pytanie, self.status, self.due, self.interval, self.ease, self.stability, self.difficulty)
+    def do_json(self):
+        d = {"id": self.id, "pytanie": self.pytanie, "status": self.status.tekst, "due_date": datetime.fromtimestamp(self.due).isoformat(), "interval": self.interval}
+        if self.ease: d["ease"] = self.ease
+        if self.stability: d["stability"] = self.stability; d["difficulty"] = self.difficulty
+        return d
+
+def nowe_id(): return str(uuid.uuid4())
+def skrot_pytania(pytanie): return hashlib.blake2b(pytanie.encode('utf-8'), digest_size=8).digest()
+
+def sciezka_postepu(deck_name): return f"{PLIK_POSTEPU_PREFIX}{deck_name}.json"
+def sciezka_postepu_binarnego(deck_name): return f"{PLIK_POSTEPU_PREFIX}{deck_name}{PLIK_BINARNY_SUFFIX}"
+
+def aktualny_snapshot(deck_name):
+    # Snapshot JSON albo binarny; gdyby zostały oba (awaria między zapisem a usunięciem starego) - nowszy.
+    istniejace = [p for p in (sciezka_postepu(deck_name), sciezka_postepu_binarnego(deck_name)) if os.path.exists(p)]
+    return max(istniejace, key=os.path.getmtime) if istniejace else None
+
+def wczytaj_snapshot_binarny(sciezka):
+    statusy = tuple(StatusKarty)
+    with open(sciezka, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < NAGLOWEK_POSTEPU.size: return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            magia, _, liczba = NAGLOWEK_POSTEPU.unpack_from(m)
+            if magia != MAGIA_POSTEPU: return []
+            liczba = min(liczba, (len(m) - NAGLOWEK_POSTEPU.size) // REKORD_POSTEPU.size)
+            with memoryview(m) as widok:
+                rekordy = widok[NAGLOWEK_POSTEPU.size:NAGLOWEK_POSTEPU.size + liczba * REKORD_POSTEPU.size]
+                karty = [Karta(id_karty.rstrip(b'\0').decode('ascii'), '', statusy[status], due, interval, ease, stability, difficulty)
+                         for id_karty, status, due, interval, ease, stability, difficulty in REKORD_POSTEPU.iter_unpack(rekordy)]
+                rekordy.release()
+    return karty
+
+def zapisz_snapshot_binarny(sciezka, dane):
+    # dane - krotki Karta.stan(); zwraca False, gdy któreś id nie mieści się w rekordzie (wtedy zapisujemy JSON).
+    if not all(len(stan[0]) <= 36 and stan[0].isascii() for stan in dane): return False
+    with open(sciezka, 'wb') as f:
+        f.write(NAGLOWEK_POSTEPU.pack(MAGIA_POSTEPU, 1, len(dane)))
+        f.write(b''.join(REKORD_POSTEPU.pack(id_karty.encode('ascii'), int(status), due, interval, ease, stability, difficulty)
+                         for id_karty, _, status, due, interval, ease, stability, difficulty in dane))
+    return True
+
+def sciezka_dziennika(deck_name): return f"{PLIK_POSTEPU_PREFIX}{deck_name}{PLIK_DZIENNIKA_SUFFIX}"
+def sciezka_historii(deck_name): return f"{PLIK_POSTEPU_PREFIX}{deck_name}{PLIK_HISTORII_SUFFIX}"
+
+def wczytaj_postep(deck_name):
+    # Snapshot progress_<deck>.json + odtworzenie dziennika (najpierw rotowany .1, potem bieżący). None = brak postępu.
+    # Zapis snapshotu w tle (też w innym procesie) może w trakcie odczytu podmienić snapshot i usunąć rotowany dziennik -
+    # wtedy czytamy od nowa; w ostatniej próbie brakujący plik dziennika pomijamy (jego wpisy są już w nowym snapshocie).
+    for proba in range(PROBY_ODCZYTU_POSTEPU):
+        try: return _wczytaj_postep(deck_name, pomin_brakujace=proba == PROBY_ODCZYTU_POSTEPU - 1)
+        except FileNotFoundError: continue
+    return None
+
+def _wczytaj_postep(deck_name, pomin_brakujace):
+    plik_postepu = aktualny_snapshot(deck_name); dziennik = sciezka_dziennika(deck_name)
+    pliki_dziennika = [p for p in (dziennik + '.1', dziennik) if os.path.exists(p)]
+    if plik_postepu is None and not pliki_dziennika: return None
+    karty = []
+    if plik_postepu and plik_postepu.endswith(PLIK_BINARNY_SUFFIX): karty = wczytaj_snapshot_binarny(plik_postepu)
+    elif plik_postepu:
+        try:
+            with open(plik_postepu, 'r', encoding='utf-8') as f: dane = json.load(f)
+            # Po id, bez powtórzeń (starsze wersje potrafiły zapisać tę samą kartę dwa razy).
+            if isinstance(dane, list): karty = list({k.id: k for k in map(Karta.z_json, (d for d in dane if isinstance(d, dict) and 'pytanie' in d))}.values())
+        except (json.JSONDecodeError, TypeError): karty = []
+    if not pliki_dziennika: return karty
+    indeks = {k.id: i for i, k in enumerate(karty)}
+    for sciezka in pliki_dziennika:
+        try: f = open(sciezka, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            if pomin_brakujace: continue
+            raise
+        with f:
+            for linia in f:
+                try: wpis = json.loads(linia)
+                except json.JSONDecodeError: continue  # urwany ostatni wpis po awarii
+                if not isinstance(wpis, dict) or 'pytanie' not in wpis: continue
+                wpis = Karta.z_json(wpis)
+                if wpis.id in indeks: karty[indeks[wpis.id]] = wpis
+                else: indeks[wpis.id] = len(karty); karty.append(wpis)
+    return karty
+
+def podsumuj_karty(karty, now=None):
+    # Zwraca (podsumowanie, najbliższy przyszły termin) - do tej chwili podsumowanie pozostaje aktualne.
+    now = now or time.time(); prog_dojrzalosci = SRS_MATURITY_THRESHOLD.total_seconds(); najblizszy = math.inf
+    summary = {'new': 0, 'learning': 0, 'young': 0, 'mature': 0}
+    for k in karty:
+        if k.status == StatusKarty.NEW: summary['new'] += 1
+        elif k.due <= now: summary['learning'] += 1
+        else:
+            if k.due < najblizszy: najblizszy = k.due
+            if k.interval >= prog_dojrzalosci: summary['mature'] += 1
+            else: summary['young'] += 1
+    return summary, najblizszy
+
+def postep_talii(deck_name):
+    # (karty z postępem należące do talii, liczba kart talii bez postępu - czyli nowych). Sam dziennik po pierwszych ocenach
+    # (albo po awarii przed snapshotem) zawiera tylko ocenione karty, więc resztę talii doliczamy z pliku .ids.
+    # Bez aktualnego .ids (talia zmieniona poza aplikacją, przed pierwszym wczytaniem) - z liczby wierszy talii.
+    karty = wczytaj_postep(deck_name) or []; magazyn = FileStorage(); naglowek, wpisy = magazyn._wczytaj_ids(deck_name)
+    if wpisy is not None and naglowek == magazyn._stempel(deck_name):
+        postep = {k.id: k for k in karty}; karty = [postep[wpis[0]] for wpis in wpisy if wpis[0] in postep]
+        return karty, len(wpisy) - len(karty)
+    return karty, max(0, sum(1 for _ in magazyn.iter_questions(deck_name)) - len(karty))
+
+def policz_podsumowanie(deck_name):
+    karty, bez_postepu = postep_talii(deck_name); summary, najblizszy = podsumuj_karty(karty); summary['new'] += bez_postepu
+    return summary, najblizszy
+
+def koniec_dnia(now=None): return datetime.combine(datetime.fromtimestamp(now or time.time()).date(), datetime.max.time()).timestamp()
+
+def policz_przeglad(deck_name):
+    # Podsumowanie + liczba powtórek wymagalnych do końca dnia (due_today); wynik ważny najdłużej do północy.
+    # Funkcja modułowa, bo wykonuje się w procesach puli (FileStorage.overview).
+    karty, bez_postepu = postep_talii(deck_name); now = time.time(); koniec = koniec_dnia(now)
+    summary, najblizszy = podsumuj_karty(karty, now); summary['new'] += bez_postepu
+    summary['due_today'] = sum(1 for k in karty if k.status != StatusKarty.NEW and k.due <= koniec)
+    return summary, min(najblizszy, koniec)
+
+def usun_postep(deck_name):
+    DziennikPostepu.poczekaj(deck_name)
+    for sciezka in (sciezka_postepu(deck_name), sciezka_postepu_binarnego(deck_name), sciezka_dziennika(deck_name), sciezka_dziennika(deck_name) + '.1', sciezka_historii(deck_name)):
+        if os.path.exists(sciezka): os.remove(sciezka)
+
+class DziennikPostepu:
+    # Dziennik append-only: jeden zwarty wiersz JSON na ocenę, kompaktowany w tle do snapshotu progress_<deck>.json
+    # (albo progress_<deck>.bin, gdy binarny=True).
+    _watki = {}
+    def __init__(self, deck_name, binarny=False):
+        self.deck_name = deck_name; self.binarny = binarny; self.plik = None; self.licznik = 0; self.lock = threading.Lock()
+    @classmethod
+    def poczekaj(cls, deck_name):
+        watek = cls._watki.get(deck_name)
+        if watek and watek.is_alive(): watek.join()
+    def dopisz(self, karta):
+        with self.lock:
+            if self.plik is None: self.plik = open(sciezka_dziennika(self.deck_name), 'a', encoding='utf-8')
+            self.plik.write(json.dumps(karta.do_json(), ensure_ascii=False, separators=(',', ':')) + '\n'); self.plik.flush()
+            self.licznik += 1
+    def kompaktuj(self, karty, po_zapisie=None):
+        watek = DziennikPostepu._watki.get(self.deck_name)
+        if watek and watek.is_alive(): return False
+        with self.lock:
+            if self.plik: self.plik.close(); self.plik = None
+            dziennik = sciezka_dziennika(self.deck_name); stary = dziennik + '.1'
+            if os.path.exists(dziennik):
+                if os.path.exists(stary):
+                    with open(dziennik, 'r', encoding='utf-8') as src, open(stary, 'a', encoding='utf-8') as dst: shutil.copyfileobj(src, dst)
+                    os.remove(dziennik)
+                else: os.replace(dziennik, stary)
+            self.licznik = 0
+        dane = [k.stan() for k in karty]  # krotki; formatowanie dat odbywa się już w wątku zapisu
+        watek = threading.Thread(target=self._zapisz_snapshot, args=(dane, po_zapisie), daemon=False)
+        DziennikPostepu._watki[self.deck_name] = watek; watek.start(); return True
+    def _zapisz_snapshot(self, dane, po_zapisie=None):
+        plik_binarny = sciezka_postepu_binarnego(self.deck_name)
+        try:
+            if self.binarny and zapisz_snapshot_binarny(plik_binarny + '.tmp', dane): plik_postepu, drugi = plik_binarny, sciezka_postepu(self.deck_name)
+            else:
+                plik_postepu, drugi = sciezka_postepu(self.deck_name), plik_binarny
+                with open(plik_postepu + '.tmp', 'w', encoding='utf-8') as f: json.dump([Karta(*stan).do_json() for stan in dane], f, ensure_ascii=False, indent=2)
+            os.replace(plik_postepu + '.tmp', plik_postepu)
+            if os.path.exists(drugi): os.remove(drugi)  # snapshot w poprzednim formacie jest już nieaktualny
+            stary = sciezka_dziennika(self.deck_name) + '.1'
+            if os.path.exists(stary): os.remove(stary)
+            if po_zapisie: po_zapisie()
+        except OSError as e: print(f"Błąd zapisu postępu: {e}")
+    def zamknij(self):
+        DziennikPostepu.poczekaj(self.deck_name)
+        with self.lock:
+            if self.plik: self.plik.close(); self.plik = None
+
+class Harmonogram:
+    # Kolejka priorytetowa kart do powtórki (klucz: termin jako timestamp) przeplatana kartami nowymi z dziennym limitem.
+    # Karty ocenione w sesji wracają do kopca, jeśli ich termin mieści się w horyzoncie nauki (1-10 minut).
+    def __init__(self, karty, now=None, limit_nowych=None, odstep_nowych=3, horyzont=SESJA_HORYZONT_NAUKI):
+        ts = now or time.time()
+        self.kopiec = []; self.nowe = deque(); self.na_poczatek = []; self.seq = itertools.count(); self.usuniete = set(); self.w_kopcu = set()
+        self.odstep_nowych = odstep_nowych; self.horyzont = horyzont.total_seconds(); self.od_ostatniej_nowej = 0
+        for k in karty:
+            if k.status == StatusKarty.NEW:
+                if limit_nowych is None or len(self.nowe) < limit_nowych: self.nowe.append(k)
+            elif k.due <= ts: self.kopiec.append((k.due, next(self.seq), k))
+        heapq.heapify(self.kopiec); self.w_kopcu = {seq for _, seq, _ in self.kopiec}
+    def _oczysc_szczyt(self):
+        while self.kopiec and self.kopiec[0][1] in self.usuniete: self.usuniete.discard(heapq.heappop(self.kopiec)[1])
+    def nastepna(self, now=None):
+        if self.na_poczatek: return self.na_poczatek.pop()
+        self._oczysc_szczyt()
+        powtorka_gotowa = bool(self.kopiec) and self.kopiec[0][0] <= (now or time.time())
+        if self.nowe and (not powtorka_gotowa or self.od_ostatniej_nowej >= self.odstep_nowych):
+            self.od_ostatniej_nowej = 0; return self.nowe.popleft()
+        if self.kopiec:  # gdy nic innego nie zostało, karty w nauce pokazujemy przed terminem
+            self.od_ostatniej_nowej += 1; _, seq, karta = heapq.heappop(self.kopiec); self.w_kopcu.discard(seq); return karta
+        return None
+    def dodaj(self, karta, now=None):
+        # Zwraca numer wpisu w kopcu (potrzebny do cofnięcia) albo None, gdy termin wykracza poza horyzont sesji.
+        if karta.due - (now or time.time()) > self.horyzont: return None
+        seq = next(self.seq); heapq.heappush(self.kopiec, (karta.due, seq, karta)); self.w_kopcu.add(seq); return seq
+    def usun(self, seq):
+        # Usuwanie leniwe - wpis pomijany przy zdjęciu ze szczytu; wpisu już zdjętego (karta na ekranie) nie ma czego usuwać.
+        if seq in self.w_kopcu: self.w_kopcu.discard(seq); self.usuniete.add(seq)
+    def przywroc(self, karta): self.na_poczatek.append(karta)
+    def liczba_nowych(self): return len(self.nowe) + sum(1 for k in self.na_poczatek if k.status == StatusKarty.NEW)
+    def liczba_powtorek(self): return len(self.w_kopcu) + sum(1 for k in self.na_poczatek if k.status != StatusKarty.NEW)
+
+class Planista(ABC):
+    # Interfejs algorytmu powtórek. ocen() zmienia stan jednej karty po ocenie (bez GUI i bez zapisu); przelicz() dostaje
+    # kolumny POLA_PRZELICZANE wszystkich kart w powtórkach i zwraca je przeliczone jednym przebiegiem (z NumPy - wektorowo).
+    nazwa = None; opis = None
+    def __init__(self, retencja=RETENCJA_DOCELOWA): self.retencja = retencja
+    @abstractmethod
+    def ocen(self, karta, ocena, now): ...
+    def przelicz(self, due, interval, ease, stability, difficulty, now): return due, interval, ease, stability, difficulty
+    @staticmethod
+    def krok_nauki(karta, ocena):
+        # Wspólne kroki dla kart nowych i w nauce (SRS_INTERVALS).
+        karta.interval = SRS_INTERVALS[{'hard': 'hard', 'good': 'good_initial', 'easy': 'easy_initial'}[ocena]].total_seconds()
+
+class PlanistaKlasyczny(Planista):
+    # Stała tabela SRS_INTERVALS z globalnym mnożnikiem good_factor.
+    nazwa = 'classic'; opis = "Klasyczny (stałe mnożniki)"
+    def ocen(self, karta, ocena, now):
+        if ocena == 'again':
+            karta.status = StatusKarty.LEARNING; karta.interval = SRS_INTERVALS['again'].total_seconds()
+        else:
+            if karta.status in (StatusKarty.NEW, StatusKarty.LEARNING): self.krok_nauki(karta, ocena)
+            elif karta.status == StatusKarty.REVIEW:
+                if ocena == 'hard': karta.interval *= 1.2
+                elif ocena == 'good': karta.interval *= SRS_INTERVALS['good_factor']
+                elif ocena == 'easy': karta.interval *= SRS_INTERVALS['good_factor'] * SRS_INTERVALS['easy_factor_bonus']
+            karta.status = StatusKarty.REVIEW
+        karta.due = now + karta.interval
+        return karta
+
+class PlanistaSM2(Planista):
+    # SM-2 z łatwością (ease) każdej karty: 'again' w powtórce obniża ją o 0.2, 'hard' o 0.15, 'easy' podnosi o 0.15.
+    nazwa = 'sm2'; opis = "SM-2 (łatwość każdej karty)"; EASE_START = 2.5; EASE_MIN = 1.3
+    def ocen(self, karta, ocena, now):
+        ease = karta.ease or self.EASE_START
+        if ocena == 'again':
+            if karta.status == StatusKarty.REVIEW: ease = max(self.EASE_MIN, ease - 0.2)
+            karta.status = StatusKarty.LEARNING; karta.interval = SRS_INTERVALS['again'].total_seconds()
+        else:
+            if karta.status in (StatusKarty.NEW, StatusKarty.LEARNING): self.krok_nauki(karta, ocena)
+            elif ocena == 'hard': karta.interval *= 1.2; ease = max(self.EASE_MIN, ease - 0.15)
+            elif ocena == 'good': karta.interval *= ease
+            else: karta.interval *= ease * SRS_INTERVALS['easy_factor_bonus']; ease += 0.15
+            karta.status = StatusKarty.REVIEW
+        karta.ease = ease; karta.due = now + karta.interval
+        return karta
+    def przelicz(self, due, interval, ease, stability, difficulty, now):
+        # Interwały SM-2 wynikają z kolejnych ocen - przeliczenie tylko nadaje łatwość kartom, które jej nie mają.
+        return due, interval, [e or self.EASE_START for e in ease], stability, difficulty
+
+class PlanistaFSRS(Planista):
+    # Model pamięci FSRS (wzory i domyślne wagi FSRS-4.5): stabilność S w dniach i trudność D (1-10). Interwał to czas,
+    # po którym prawdopodobieństwo przypomnienia spadnie do `retencja`. Kroki nauki (minuty) nie zmieniają modelu.
+    nazwa = 'fsrs'; opis = "FSRS (model pamięci)"
+    W = (0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474, 0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755)
+    DECAY = -0.5; FACTOR = 19 / 81; MAKS_INTERWAL = 36500
+    def mnoznik(self): return (self.retencja ** (1 / self.DECAY) - 1) / self.FACTOR  # interwał [dni] = S * mnoznik
+    def trudnosc_poczatkowa(self, g): return min(max(self.W[4] - (g - 3) * self.W[5], 1.0), 10.0)
+    def ocen(self, karta, ocena, now):
+        g = OCENY.index(ocena) + 1; w = self.W
+        if karta.status == StatusKarty.NEW or (not karta.stability and karta.status != StatusKarty.REVIEW): s, d = w[g - 1], self.trudnosc_poczatkowa(g)
+        elif karta.status == StatusKarty.REVIEW:
+            # Powtórka bez modelu (klasyczny planista / SM-2, bez przeliczenia talii) - start jak w przelicz(): S = interwał.
+            dni = max(now - (karta.due - karta.interval), 0.0) / DZIEN
+            s, d = karta.stability or max(karta.interval / DZIEN, 0.1), karta.difficulty or self.trudnosc_poczatkowa(3)
+            r = (1 + self.FACTOR * dni / s) ** self.DECAY
+            if g == 1: s = w[11] * d ** -w[12] * ((s + 1) ** w[13] - 1) * math.exp(w[14] * (1 - r))
+            else: s *= 1 + math.exp(w[8]) * (11 - d) * s ** -w[9] * (math.exp(w[10] * (1 - r)) - 1) * (w[15] if g == 2 else 1) * (w[16] if g == 4 else 1)
+            d = min(max(w[7] * self.trudnosc_poczatkowa(4) + (1 - w[7]) * (d - w[6] * (g - 3)), 1.0), 10.0)
+        else: s, d = karta.stability, karta.difficulty
+        karta.stability, karta.difficulty = s, d
+        if g == 1: karta.status = StatusKarty.LEARNING; karta.interval = SRS_INTERVALS['again'].total_seconds()
+        elif g == 2 and karta.status != StatusKarty.REVIEW: karta.status = StatusKarty.LEARNING; karta.interval = SRS_INTERVALS['hard'].total_seconds()
+        else: karta.status = StatusKarty.REVIEW; karta.interval = min(max(round(s * self.mnoznik()), 1), self.MAKS_INTERWAL) * DZIEN
+        karta.due = now + karta.interval
+        return karta
+    def przelicz(self, due, interval, ease, stability, difficulty, now):
+        # Karty bez modelu (np. po klasycznym planiście) dostają S = obecny interwał (przy R = 0.9 interwał równa się S)
+        # i trudność jak po ocenie 'good'; termin liczony od ostatniej powtórki (due - interval).
+        d0 = self.trudnosc_poczatkowa(3); mnoznik = self.mnoznik()
+        if np is not None:
+            due, interval, stability, difficulty = (np.asarray(k, dtype=float) for k in (due, interval, stability, difficulty))
+            stability = np.where(stability > 0, stability, np.maximum(interval / DZIEN, 0.1)); difficulty = np.where(difficulty > 0, difficulty, d0)
+            nowy = np.clip(np.round(stability * mnoznik), 1, self.MAKS_INTERWAL) * DZIEN
+            return (due - interval + nowy).tolist(), nowy.tolist(), list(ease), stability.tolist(), difficulty.tolist()
+        stability = [s or max(i / DZIEN, 0.1) for s, i in zip(stability, interval)]; difficulty = [d or d0 for d in difficulty]
+        nowy = [min(max(round(s * mnoznik), 1), self.MAKS_INTERWAL) * DZIEN for s in stability]
+        return [t - i + n for t, i, n in zip(due, interval, nowy)], nowy, list(ease), stability, difficulty
+
+PLANISTY = {klasa.nazwa: klasa for klasa in (PlanistaKlasyczny, PlanistaSM2, PlanistaFSRS)}
+PLANISTA_KLASYCZNY = PlanistaKlasyczny()
+
+def utworz_planiste(nazwa, retencja=RETENCJA_DOCELOWA): return PLANISTY.get(nazwa, PlanistaKlasyczny)(retencja)
+
+def zastosuj_ocene(karta, ocena, now=None, planista=None):
+    # Jedna ocena według wybranego planisty (domyślnie klasycznego): zmienia status, interwał, termin i stan modelu karty.
+    return (planista or PLANISTA_KLASYCZNY).ocen(karta, ocena, now or time.time())
+
+def wpis_historii(ocena, przed, karta, now):
+    # przed = (status, interwał) karty sprzed oceny; wynik idzie do storage.record_history.
+    return (now, OCENY.index(ocena), int(przed[0]), przed[1] / DZIEN, karta.interval / DZIEN)
+
+def rekordy_historii(sciezka):
+    # Niepełny ostatni rekord (zapis przerwany awarią) jest pomijany.
+    if not os.path.exists(sciezka): return []
+    with open(sciezka, 'rb') as f: dane = f.read()
+    return REKORD_HISTORII.iter_unpack(dane[:len(dane) - len(dane) % REKORD_HISTORII.size])
+
+def wczytaj_historie(sciezka):
+    # Kolumny (czas, ocena, status przed, interwał przed) - z NumPy jako tablice czytane wprost z pliku.
+    if np is not None and os.path.exists(sciezka):
+        rekordy = np.fromfile(sciezka, dtype=TYP_HISTORII, count=os.path.getsize(sciezka) // REKORD_HISTORII.size)
+        return rekordy['ts'], rekordy['ocena'], rekordy['status'], rekordy['przed']
+    kolumny = list(zip(*rekordy_historii(sciezka)))
+    return tuple(kolumny[:4]) if kolumny else ((), (), (), ())
+
+def _niecofniete(ts, oceny):
+    # Indeksy ocen, które zostały: znacznik cofnięcia zdejmuje ostatnią wcześniejszą ocenę z tym samym czasem.
+    zostaly = {}
+    for i, (t, ocena) in enumerate(zip(ts, oceny)):
+        if ocena != OCENA_COFNIETA: zostaly.setdefault(t, []).append(i)
+        elif zostaly.get(t): zostaly[t].pop()
+    return sorted(i for indeksy in zostaly.values() for i in indeksy)
+
+def analizuj_talie(status, due, interval, historia, now=None, horyzont=HORYZONT_PROGNOZY):
+    # Prognoza powtórek na kolejne dni (zaległe liczą się na dziś), histogram interwałów kart w powtórkach
+    # i skuteczność powtórek (ocena inna niż 'again') z historii ocen. Z NumPy wektorowo, bez niego pętlą.
+    now = now or time.time(); poczatek = datetime.combine(datetime.fromtimestamp(now).date(), datetime.min.time()).timestamp()
+    prog = SRS_MATURITY_THRESHOLD.total_seconds() / DZIEN; ts, oceny, status_przed, przed = historia
+    if np is not None:
+        status = np.asarray(status, dtype=np.int8); due = np.asarray(due, dtype=float); interval = np.asarray(interval, dtype=float)
+        ts, oceny, status_przed, przed = (np.asarray(kolumna) for kolumna in (ts, oceny, status_przed, przed))
+        dni = np.maximum((due[status != StatusKarty.NEW] - poczatek) // DZIEN, 0).astype(np.int64)
+        prognoza = np.bincount(dni[dni < horyzont], minlength=horyzont)
+        przedzialy = np.bincount(np.searchsorted(PRZEDZIALY_INTERWALOW, interval[status == StatusKarty.REVIEW] / DZIEN, side='right') - 1, minlength=len(PRZEDZIALY_INTERWALOW))
+        if (oceny == OCENA_COFNIETA).any():
+            zostaly = _niecofniete(ts.tolist(), oceny.tolist()); ts, oceny, status_przed, przed = ts[zostaly], oceny[zostaly], status_przed[zostaly], przed[zostaly]
+        powtorki = status_przed == StatusKarty.REVIEW; udane = oceny != 0
+        grupy = {'all': powtorki, 'young': powtorki & (przed < prog), 'mature': powtorki & (przed >= prog), 'last_30': powtorki & (ts >= now - 30 * DZIEN)}
+        skutecznosc = {nazwa: (int((maska & udane).sum()), int(maska.sum())) for nazwa, maska in grupy.items()}
+        return {'forecast': prognoza.tolist(), 'intervals': przedzialy.tolist(), 'retention': skutecznosc, 'reviews': len(oceny)}
+    prognoza = [0] * horyzont; przedzialy = [0] * len(PRZEDZIALY_INTERWALOW)
+    for s, d, i in zip(status, due, interval):
+        if s == StatusKarty.NEW: continue
+        dzien = max(int((d - poczatek) // DZIEN), 0)
+        if dzien < horyzont: prognoza[dzien] += 1
+        if s == StatusKarty.REVIEW: przedzialy[bisect.bisect_right(PRZEDZIALY_INTERWALOW, i / DZIEN) - 1] += 1
+    zostaly = _niecofniete(ts, oceny) if OCENA_COFNIETA in oceny else range(len(oceny))
+    skutecznosc = {nazwa: [0, 0] for nazwa in ('all', 'young', 'mature', 'last_30')}
+    for j in zostaly:
+        if status_przed[j] != StatusKarty.REVIEW: continue
+        grupy = ('all', 'young' if przed[j] < prog else 'mature') + (('last_30',) if ts[j] >= now - 30 * DZIEN else ())
+        for nazwa in grupy: skutecznosc[nazwa][0] += oceny[j] != 0; skutecznosc[nazwa][1] += 1
+    return {'forecast': prognoza, 'intervals': przedzialy, 'retention': {nazwa: tuple(w) for nazwa, w in skutecznosc.items()}, 'reviews': len(zostaly)}
+
+class SummaryCache:
+    # Podsumowania talii kluczowane mtime/rozmiarem plików talii, snapshotu i dziennika; ważne do najbliższego terminu.
+    def __init__(self, licz=policz_podsumowanie): self.entries = {}; self.lock = threading.Lock(); self.licz = licz
+    @staticmethod
+    def file_key(deck_name):
+        key = []
+        for sciezka in (os.path.join(FOLDER_PRZEDMIOTOW, f"{deck_name}.txt"), sciezka_postepu(deck_name), sciezka_postepu_binarnego(deck_name), sciezka_dziennika(deck_name), sciezka_dziennika(deck_name) + '.1'):
+            try: st = os.stat(sciezka); key.append((st.st_mtime_ns, st.st_size))
+            except OSError: key.append(None)
+        return tuple(key)
+    def _z_cache(self, deck_name):
+        with self.lock: entry = self.entries.get(deck_name)
+        if entry and time.time() < entry['valid_until'] and (entry['key'] is None or entry['key'] == self.file_key(deck_name)): return dict(entry['summary'])
+        return None
+    def get(self, deck_name):
+        summary = self._z_cache(deck_name)
+        if summary is not None: return summary
+        key = self.file_key(deck_name); summary, valid_until = self.licz(deck_name)
+        with self.lock: self.entries[deck_name] = {'key': key, 'summary': summary, 'valid_until': valid_until}
+        return dict(summary)
+    def get_many(self, deck_names, utworz_pule=None):
+        # Trafienia z cache od razu; pozostałe talie liczone w puli procesów, gdy jest ich co najmniej PRZEGLAD_PROG_PULI.
+        wynik = {}; brakujace = []
+        for deck_name in deck_names:
+            summary = self._z_cache(deck_name)
+            if summary is None: brakujace.append(deck_name)
+            else: wynik[deck_name] = summary
+        if not brakujace: return wynik
+        klucze = [self.file_key(deck_name) for deck_name in brakujace]  # klucz sprzed liczenia - zmiana w trakcie wymusi ponowne liczenie
+        pula = utworz_pule() if utworz_pule and len(brakujace) >= PRZEGLAD_PROG_PULI else None
+        policzone = pula.map(self.licz, brakujace, chunksize=max(1, len(brakujace) // 16)) if pula else map(self.licz, brakujace)
+        for deck_name, key, (summary, valid_until) in zip(brakujace, klucze, policzone):
+            with self.lock: self.entries[deck_name] = {'key': key, 'summary': summary, 'valid_until': valid_until}
+            wynik[deck_name] = dict(summary)
+        return {deck_name: wynik[deck_name] for deck_name in deck_names}
+    def put(self, deck_name, summary, valid_until):
+        # Wpis bez klucza (key=None) obowiązuje krótko - dopiero stamp() po udanym zapisie w tle przywraca pełną ważność.
+        # Gdy zapis się nie uda, po PODSUMOWANIE_NIEPOTWIERDZONE_S podsumowanie liczone jest znów z plików.
+        with self.lock: self.entries[deck_name] = {'key': None, 'summary': summary, 'valid_until': min(valid_until, time.time() + PODSUMOWANIE_NIEPOTWIERDZONE_S), 'po_zapisie': valid_until}
+    def stamp(self, deck_name):
+        key = self.file_key(deck_name)
+        with self.lock:
+            entry = self.entries.get(deck_name)
+            if entry and entry['key'] is None: entry['key'] = key; entry['valid_until'] = entry.pop('po_zapisie', entry['valid_until'])
+    def invalidate(self, deck_name):
+        with self.lock: self.entries.pop(deck_name, None)
+
+def migruj_stary_postep(storage):
+    # Jednorazowo: postep.json z pierwszych wersji (lista {text, status}) staje się talią 'postep' z postępem w obecnym
+    # formacie. Pytania, które są już w którejś talii, są pomijane; oryginał zostaje jako postep.json.bak.
+    # Wywoływane raz przy starcie aplikacji i CLI dla wybranego magazynu - nie w konstruktorach magazynów.
+    if not os.path.exists(PLIK_STAREGO_POSTEPU): return None
+    try:
+        with open(PLIK_STAREGO_POSTEPU, 'r', encoding='utf-8') as f: dane = json.load(f)
+    except (OSError, json.JSONDecodeError): return None
+    os.makedirs(FOLDER_PRZEDMIOTOW, exist_ok=True); talie = storage.list_decks()
+    znane = {skrot_pytania(pytanie) for deck_name in talie for pytanie in storage.iter_questions(deck_name)}; wpisy = []
+    for d in dane if isinstance(dane, list) else []:
+        pytanie = str(d.get('text') or '').strip() if isinstance(d, dict) else ''
+        if pytanie and skrot_pytania(pytanie) not in znane: znane.add(skrot_pytania(pytanie)); wpisy.append((pytanie, d.get('status')))
+    deck_name = None
+    if wpisy:
+        deck_name = os.path.splitext(PLIK_STAREGO_POSTEPU)[0]
+        while deck_name in talie: deck_name += '_'
+        storage.create_deck(deck_name); storage.append_questions(deck_name, [pytanie for pytanie, _ in wpisy])
+        # Stary format znał tylko "nieodpowiedziane" i odpowiedziane - te drugie wracają jako powtórka na dziś.
+        # record_review zapisuje kartę w każdym magazynie (save_progress w SQLite tylko zatwierdza transakcję).
+        karty = storage.load_cards(deck_name); now = time.time()
+        for karta, (_, status) in zip(karty, wpisy):
+            if status != 'nieodpowiedziane': karta.status = StatusKarty.REVIEW; karta.due = now; karta.interval = DZIEN; storage.record_review(deck_name, karta)
+        storage.save_progress(deck_name, karty); DziennikPostepu.poczekaj(deck_name)
+    os.replace(PLIK_STAREGO_POSTEPU, PLIK_STAREGO_POSTEPU + '.bak')
+    return deck_name
+
+class FileStorage:
+    # Domyślny magazyn: talie w decks/<nazwa>.txt z identyfikatorami kart w decks/<nazwa>.ids,
+    # postęp w progress_<nazwa>.json (binarny=True: progress_<nazwa>.bin) + dziennik, łączony z talią po id karty.
+    # Oba formaty snapshotu są czytane zawsze - kolejna kompaktacja zapisuje postęp w wybranym i usuwa drugi.
+    def __init__(self, binarny=False):
+        self.summary_cache = SummaryCache(); self.overview_cache = SummaryCache(policz_przeglad); self.dzienniki = {}; self.pula = None; self.binarny = binarny
+    def deck_path(self, deck_name): return os.path.join(FOLDER_PRZEDMIOTOW, f"{deck_name}.txt")
+    def ids_path(self, deck_name): return os.path.join(FOLDER_PRZEDMIOTOW, f"{deck_name}{PLIK_ID_SUFFIX}")
+    def _stempel(self, deck_name):
+        # Stała szerokość - nagłówek pliku .ids można nadpisać w miejscu po dopisaniu partii pytań.
+        try: st = os.stat(self.deck_path(deck_name)); return f"#{st.st_size:020d} {st.st_mtime_ns:024d}"
+        except OSError: return "#"
+    def _wczytaj_ids(self, deck_name):
+        try:
+            with open(self.ids_path(deck_name), 'r', encoding='utf-8') as f: naglowek = f.readline().rstrip('\n'); return naglowek, [tuple(linia.rstrip('\n').split('\t', 1)) for linia in f]
+        except (OSError, ValueError): return None, None
+    def _zapisz_ids(self, deck_name, ids, questions):
+        tmp = self.ids_path(deck_name) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self._stempel(deck_name) + '\n'); f.writelines(f"{id_karty}\t{skrot_pytania(pytanie).hex()}\n" for id_karty, pytanie in zip(ids, questions))
+        os.replace(tmp, self.ids_path(deck_name))
+    def _dopasuj_ids(self, deck_name, questions, wpisy):
+        # Plik .txt zmieniony poza aplikacją (albo stara talia bez .ids). Kolejno: ta sama treść (powtórzenia w dawnej kolejności),
+        # zmieniona treść w miejscu dawnego wiersza (za poprzednim dopasowanym), treść z zapisanego postępu; reszta dostaje nowe id.
+        ids = [None] * len(questions); uzyte = set(); po_skrocie = defaultdict(deque); pozycja = {}
+        def przypisz(i, id_karty): ids[i] = id_karty; uzyte.add(id_karty)
+        for j, wpis in enumerate(wpisy):
+            if len(wpis) == 2: po_skrocie[wpis[1]].append(wpis[0]); pozycja[wpis[0]] = j
+        for i, pytanie in enumerate(questions):
+            kandydaci = po_skrocie.get(skrot_pytania(pytanie).hex())
+            if kandydaci: przypisz(i, kandydaci.popleft())
+        for i in range(len(questions)):
+            if ids[i] is not None: continue
+            j = pozycja[ids[i - 1]] + 1 if i and ids[i - 1] in pozycja else i
+            if j < len(wpisy) and len(wpisy[j]) == 2 and wpisy[j][0] not in uzyte: przypisz(i, wpisy[j][0])
+        if None in ids:
+            po_tresci = defaultdict(deque)
+            for k in wczytaj_postep(deck_name) or []:
+                if k.id not in uzyte: po_tresci[k.pytanie].append(k.id)
+            for i, pytanie in enumerate(questions):
+                if ids[i] is None: przypisz(i, po_tresci[pytanie].popleft() if po_tresci[pytanie] else nowe_id())
+        return ids
+    def load_deck(self, deck_name):
+        # (ids, pytania). Gdy .txt nie zmienił się od zapisu .ids (rozmiar + mtime w nagłówku), ids czytane są wprost.
+        questions = self.load_questions(deck_name); naglowek, wpisy = self._wczytaj_ids(deck_name)
+        if wpisy is not None and len(wpisy) == len(questions) and naglowek == self._stempel(deck_name): return [wpis[0] for wpis in wpisy], questions
+        ids = self._dopasuj_ids(deck_name, questions, wpisy or []); self._zapisz_ids(deck_name, ids, questions)
+        return ids, questions
+    def list_decks(self): return [f[:-len('.txt')] for f in os.listdir(FOLDER_PRZEDMIOTOW) if f.endswith('.txt')]
+    def load_questions(self, deck_name): return list(self.iter_questions(deck_name))
+    def iter_questions(self, deck_name):
+        if not os.path.exists(self.deck_path(deck_name)): return
+        with open(self.deck_path(deck_name), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip(): yield line.strip()
+    def append_questions(self, deck_name, questions):
+        # Dopisanie partii na koniec pliku talii bez przepisywania go; brakujący znak końca linii jest uzupełniany.
+        if not os.path.exists(self.ids_path(deck_name)): self.load_deck(deck_name)  # stara talia - najpierw utrwalamy jej id
+        with open(self.deck_path(deck_name), 'ab+') as f:
+            f.seek(0, os.SEEK_END); dopisz_koniec_linii = False
+            if f.tell(): f.seek(-1, os.SEEK_END); dopisz_koniec_linii = f.read(1) != b'\n'
+            f.write(('\n' if dopisz_koniec_linii else '').encode('utf-8') + ''.join(pytanie + '\n' for pytanie in questions).encode('utf-8'))
+        with open(self.ids_path(deck_name), 'r+b') as f:
+            f.seek(0, os.SEEK_END); f.write(''.join(f"{nowe_id()}\t{skrot_pytania(pytanie).hex()}\n" for pytanie in questions).encode('utf-8'))
+            f.seek(0); f.write(self._stempel(deck_name).encode('ascii'))
+    def save_questions(self, deck_name, questions, ids=None):
+        # ids równoległe do questions (DeckEditor) zachowują historię edytowanych kart; bez nich dopasowanie jak w load_deck.
+        if ids is None: ids = self._dopasuj_ids(deck_name, questions, self._wczytaj_ids(deck_name)[1] or [])
+        tmp = self.deck_path(deck_name) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f: f.writelines(pytanie + '\n' for pytanie in questions)
+        os.replace(tmp, self.deck_path(deck_name)); self._zapisz_ids(deck_name, ids, questions)
+    def create_deck(self, deck_name):
+        with open(self.deck_path(deck_name), 'w', encoding='utf-8') as f: pass
+        self._zapisz_ids(deck_name, [], [])
+    def delete_deck(self, deck_name):
+        for sciezka in (self.deck_path(deck_name), self.ids_path(deck_name)):
+            if os.path.exists(sciezka): os.remove(sciezka)
+        self.reset_progress(deck_name)
+    def load_session_cards(self, deck_name):
+        # Złączenie po id: postęp przypisany do karty przetrwa edycję treści, a powtórzone pytania mają osobne karty.
+        ids, questions = self.load_deck(deck_name); postep = {k.id: k for k in wczytaj_postep(deck_name) or []}; karty = []
+        for id_karty, pytanie in zip(ids, questions):
+            karta = postep.get(id_karty)
+            if karta is None: karta = Karta.nowa(pytanie, id_karty)
+            else: karta.pytanie = pytanie
+            karty.append(karta)
+        return karty
+    def load_cards(self, deck_name): return self.load_session_cards(deck_name)  # sesja i tak dostaje całą talię
+    def browse_cards(self, deck_name): return self.load_session_cards(deck_name)
+    def summary(self, deck_name): return self.summary_cache.get(deck_name)
+    def overview(self, deck_names):
+        # Przegląd wielu talii: {talia: podsumowanie + due_today}; każdy proces puli parsuje osobne pliki postępu.
+        return self.overview_cache.get_many(deck_names, self._pula)
+    def _pula(self):
+        # 'spawn' - fork procesu z wątkami i Tk nie jest bezpieczny; pula żyje do close(). Na jednym rdzeniu liczymy w wątku.
+        if (os.cpu_count() or 1) < 2: return None
+        if self.pula is None: self.pula = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1), mp_context=multiprocessing.get_context('spawn'))
+        return self.pula
+    def journal(self, deck_name):
+        if deck_name not in self.dzienniki: self.dzienniki[deck_name] = DziennikPostepu(deck_name, self.binarny)
+        return self.dzienniki[deck_name]
+    def record_review(self, deck_name, karta):
+        # Zwraca True, gdy dziennik urósł na tyle, że warto go skompaktować (save_progress).
+        dziennik = self.journal(deck_name); dziennik.dopisz(karta)
+        return dziennik.licznik >= DZIENNIK_PROG_KOMPAKCJI
+    def record_history(self, deck_name, wpis):
+        with open(sciezka_historii(deck_name), 'ab') as f: f.write(REKORD_HISTORII.pack(*wpis))
+    def reschedule(self, deck_name, planista, now=None):
+        # Nowe terminy wszystkich kart w powtórkach jednym przebiegiem planisty, zapisane jako świeży snapshot.
+        karty = self.load_session_cards(deck_name); powtorki = [k for k in karty if k.status == StatusKarty.REVIEW]
+        if not powtorki: return 0
+        wynik = planista.przelicz(*([getattr(k, pole) for k in powtorki] for pole in POLA_PRZELICZANE), now or time.time())
+        for karta, stan in zip(powtorki, zip(*wynik)): karta.due, karta.interval, karta.ease, karta.stability, karta.difficulty = stan
+        DziennikPostepu.poczekaj(deck_name)  # zmiany nie idą przez dziennik, więc snapshot nie może zostać pominięty
+        self.save_progress(deck_name, karty); return len(powtorki)
+    def analytics(self, deck_name):
+        karty = self.load_session_cards(deck_name)
+        return analizuj_talie([k.status for k in karty], [k.due for k in karty], [k.interval for k in karty], wczytaj_historie(sciezka_historii(deck_name)))
+    def save_progress(self, deck_name, karty):
+        cache = self.summary_cache; cache.put(deck_name, *podsumuj_karty(karty))
+        if not self.journal(deck_name).kompaktuj(karty, po_zapisie=lambda: cache.stamp(deck_name)): cache.invalidate(deck_name)
+    def reset_progress(self, deck_name):
+        if deck_name in self.dzienniki: self.dzienniki.pop(deck_name).zamknij()
+        usun_postep(deck_name); self.summary_cache.invalidate(deck_name); self.overview_cache.invalidate(deck_name)
+    def close(self):
+        for dziennik in self.dzienniki.values(): dziennik.zamknij()
+        if self.pula: self.pula.shutdown(); self.pula = None
+
+def synchronizowane(metoda):
+    def opakowanie(self, *args, **kwargs):
+        with self.lock: return metoda(self, *args, **kwargs)
+    opakowanie.__name__ = metoda.__name__; return opakowanie
+
+class SQLiteStorage:
+    # Opcjonalny magazyn w jednej bazie SQLite; indeks (deck, status, due) obsługuje start sesji i podsumowania.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS decks (name TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS cards (
+            id TEXT PRIMARY KEY, deck TEXT NOT NULL, pozycja INTEGER NOT NULL, pytanie TEXT NOT NULL,
+            status INTEGER NOT NULL DEFAULT 0, due REAL NOT NULL, interval REAL NOT NULL DEFAULT 0,
+            ease REAL NOT NULL DEFAULT 0, stability REAL NOT NULL DEFAULT 0, difficulty REAL NOT NULL DEFAULT 0);
+        CREATE INDEX IF NOT EXISTS cards_deck_status_due ON cards(deck, status, due);
+        CREATE INDEX IF NOT EXISTS cards_deck_pozycja ON cards(deck, pozycja);
+        CREATE TABLE IF NOT EXISTS reviews (
+            deck TEXT NOT NULL, ts REAL NOT NULL, ocena INTEGER NOT NULL, status INTEGER NOT NULL, interval_przed REAL NOT NULL, interval_po REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS reviews_deck ON reviews(deck);
+    """
+    KOLUMNY = "id, pytanie, status, due, interval, ease, stability, difficulty"
+    def __init__(self, path=PLIK_BAZY):
+        self.conn = sqlite3.connect(path, check_same_thread=False); self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL"); self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        istniejace = {row[1] for row in self.conn.execute("PRAGMA table_info(cards)")}
+        for kolumna in ('ease', 'stability', 'difficulty'):  # bazy sprzed planistów
+            if kolumna not in istniejace: self.conn.execute(f"ALTER TABLE cards ADD COLUMN {kolumna} REAL NOT NULL DEFAULT 0")
+        if self.conn.execute("SELECT 1 FROM decks LIMIT 1").fetchone() is None: self.import_from_files(FileStorage())
+    @staticmethod
+    def _karta(row): return Karta(row[0], row[1], StatusKarty(row[2]), *row[3:])
+    @synchronizowane
+    def import_from_files(self, files):
+        # Jednorazowa migracja par decks/<nazwa>.txt + progress_<nazwa>.json do bazy.
+        with self.conn:
+            for deck_name in files.list_decks():
+                self.conn.execute("INSERT OR IGNORE INTO decks(name) VALUES (?)", (deck_name,))
+                self.conn.executemany("INSERT OR REPLACE INTO cards(id, deck, pozycja, pytanie, status, due, interval, ease, stability, difficulty) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      ((k.id, deck_name, i, k.pytanie, int(k.status), k.due, k.interval, k.ease, k.stability, k.difficulty) for i, k in enumerate(files.load_session_cards(deck_name))))
+                self.conn.executemany("INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?)", ((deck_name,) + wpis for wpis in rekordy_historii(sciezka_historii(deck_name))))
+    @synchronizowane
+    def list_decks(self): return [row[0] for row in self.conn.execute("SELECT name FROM decks ORDER BY name")]
+    @synchronizowane
+    def load_questions(self, deck_name): return [row[0] for row in self.conn.execute("SELECT pytanie FROM cards WHERE deck = ? ORDER BY pozycja", (deck_name,))]
+    @synchronizowane
+    def load_deck(self, deck_name):
+        wiersze = self.conn.execute("SELECT id, pytanie FROM cards WHERE deck = ? ORDER BY pozycja", (deck_name,)).fetchall()
+        return [row[0] for row in wiersze], [row[1] for row in wiersze]
+    def iter_questions(self, deck_name):
+        # Kursor czytany porcjami, z blokadą tylko na czas pobrania porcji.
+        with self.lock: kursor = self.conn.execute("SELECT pytanie FROM cards WHERE deck = ? ORDER BY pozycja", (deck_name,))
+        while True:
+            with self.lock: wiersze = kursor.fetchmany(IMPORT_PARTIA)
+            if not wiersze: return
+            for row in wiersze: yield row[0]
+    @synchronizowane
+    def append_questions(self, deck_name, questions):
+        start = self.conn.execute("SELECT COALESCE(MAX(pozycja) + 1, 0) FROM cards WHERE deck = ?", (deck_name,)).fetchone()[0]
+        with self.conn:
+            self.conn.executemany("INSERT INTO cards(id, deck, pozycja, pytanie, status, due, interval) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  ((k.id, deck_name, start + i, k.pytanie, int(k.status), k.due, k.interval) for i, k in enumerate(map(Karta.nowa, questions))))
+    @synchronizowane
+    def save_questions(self, deck_name, questions, ids=None):
+        # Z ids (DeckEditor) wiersze aktualizowane są po id - postęp zostaje przy edytowanej karcie.
+        # Bez ids postęp zostaje przy wierszach, których treść się nie zmieniła.
+        if ids is not None:
+            istniejace = {row[0] for row in self.conn.execute("SELECT id FROM cards WHERE deck = ?", (deck_name,))}; zmiany, nowe = [], []
+            for i, (id_karty, pytanie) in enumerate(zip(ids, questions)):
+                if id_karty in istniejace: zmiany.append((i, pytanie, id_karty))
+                else: k = Karta.nowa(pytanie, id_karty); nowe.append((k.id, deck_name, i, k.pytanie, int(k.status), k.due, k.interval))
+            with self.conn:
+                self.conn.executemany("DELETE FROM cards WHERE id = ?", ((id_karty,) for id_karty in istniejace - set(ids)))
+                self.conn.executemany("UPDATE cards SET pozycja = ?, pytanie = ? WHERE id = ?", zmiany)
+                self.conn.executemany("INSERT INTO cards(id, deck, pozycja, pytanie, status, due, interval) VALUES (?, ?, ?, ?, ?, ?, ?)", nowe)
+            return
+        wolne = {}
+        for id_karty, pytanie in self.conn.execute("SELECT id, pytanie FROM cards WHERE deck = ?", (deck_name,)): wolne.setdefault(pytanie, deque()).append(id_karty)
+        pozycje, nowe = [], []
+        for i, pytanie in enumerate(questions):
+            if wolne.get(pytanie): pozycje.append((i, wolne[pytanie].popleft()))
+            else: k = Karta.nowa(pytanie); nowe.append((k.id, deck_name, i, k.pytanie, int(k.status), k.due, k.interval))
+        with self.conn:
+            self.conn.executemany("DELETE FROM cards WHERE id = ?", ((id_karty,) for ids in wolne.values() for id_karty in ids))
+            self.conn.executemany("UPDATE cards SET pozycja = ? WHERE id = ?", pozycje)
+            self.conn.executemany("INSERT INTO cards(id, deck, pozycja, pytanie, status, due, interval) VALUES (?, ?, ?, ?, ?, ?, ?)", nowe)
+    @synchronizowane
+    def create_deck(self, deck_name):
+        with self.conn: self.conn.execute("INSERT OR IGNORE INTO decks(name) VALUES (?)", (deck_name,))
+    @synchronizowane
+    def delete_deck(self, deck_name):
+        with self.conn:
+            self.conn.execute("DELETE FROM cards WHERE deck = ?", (deck_name,)); self.conn.execute("DELETE FROM decks WHERE name = ?", (deck_name,))
+            self.conn.execute("DELETE FROM reviews WHERE deck = ?", (deck_name,))
+    @synchronizowane
+    def load_session_cards(self, deck_name):
+        # Tylko karty nowe i już wymagalne - oba zapytania idą po indeksie (deck, status, due).
+        nowe = self.conn.execute(f"SELECT {self.KOLUMNY} FROM cards WHERE deck = ? AND status = ? ORDER BY pozycja", (deck_name, int(StatusKarty.NEW))).fetchall()
+        wymagalne = self.conn.execute(f"SELECT {self.KOLUMNY} FROM cards WHERE deck = ? AND status IN (?, ?) AND due <= ?",
+                                      (deck_name, int(StatusKarty.LEARNING), int(StatusKarty.REVIEW), time.time())).fetchall()
+        return [self._karta(row) for row in wymagalne + nowe]
+    @synchronizowane
+    def load_cards(self, deck_name): return self.browse_cards(deck_name)
+    @synchronizowane
+    def browse_cards(self, deck_name): return [self._karta(row) for row in self.conn.execute(f"SELECT {self.KOLUMNY} FROM cards WHERE deck = ? ORDER BY pozycja", (deck_name,))]
+    @synchronizowane
+    def summary(self, deck_name):
+        summary = {'new': 0, 'learning': 0, 'young': 0, 'mature': 0}
+        for klucz, liczba in self.conn.execute("""SELECT CASE WHEN status = ? THEN 'new' WHEN due <= ? THEN 'learning' WHEN interval >= ? THEN 'mature' ELSE 'young' END AS k, COUNT(*)
+                                                 FROM cards WHERE deck = ? GROUP BY k""", (int(StatusKarty.NEW), time.time(), SRS_MATURITY_THRESHOLD.total_seconds(), deck_name)):
+            summary[klucz] = liczba
+        return summary
+    @synchronizowane
+    def overview(self, deck_names):
+        # Jedno zapytanie GROUP BY dla wszystkich talii - baza nie potrzebuje puli procesów.
+        wynik = {deck_name: {'new': 0, 'learning': 0, 'young': 0, 'mature': 0, 'due_today': 0} for deck_name in deck_names}
+        now = time.time()
+        for deck_name, klucz, liczba, dzis in self.conn.execute("""SELECT deck, CASE WHEN status = ? THEN 'new' WHEN due <= ? THEN 'learning' WHEN interval >= ? THEN 'mature' ELSE 'young' END AS k,
+                                                                COUNT(*), SUM(status != ? AND due <= ?) FROM cards GROUP BY deck, k""",
+                                                             (int(StatusKarty.NEW), now, SRS_MATURITY_THRESHOLD.total_seconds(), int(StatusKarty.NEW), koniec_dnia(now))):
+            if deck_name in wynik: wynik[deck_name][klucz] = liczba; wynik[deck_name]['due_today'] += dzis
+        return wynik
+    @synchronizowane
+    def record_review(self, deck_name, karta):
+        with self.conn: self.conn.execute("UPDATE cards SET status = ?, due = ?, interval = ?, ease = ?, stability = ?, difficulty = ? WHERE id = ?",
+                                          (int(karta.status), karta.due, karta.interval, karta.ease, karta.stability, karta.difficulty, karta.id))
+        return False
+    @synchronizowane
+    def record_history(self, deck_name, wpis):
+        with self.conn: self.conn.execute("INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?)", (deck_name,) + tuple(wpis))
+    @synchronizowane
+    def reschedule(self, deck_name, planista, now=None):
+        wiersze = self.conn.execute(f"SELECT id, {', '.join(POLA_PRZELICZANE)} FROM cards WHERE deck = ? AND status = ?", (deck_name, int(StatusKarty.REVIEW))).fetchall()
+        if not wiersze: return 0
+        ids, *kolumny = zip(*wiersze); wynik = planista.przelicz(*kolumny, now or time.time())
+        with self.conn: self.conn.executemany(f"UPDATE cards SET {', '.join(p + ' = ?' for p in POLA_PRZELICZANE)} WHERE id = ?", (stan + (id_karty,) for id_karty, stan in zip(ids, zip(*wynik))))
+        return len(ids)
+    @synchronizowane
+    def analytics(self, deck_name):
+        karty = self.conn.execute("SELECT status, due, interval FROM cards WHERE deck = ? AND status != ?", (deck_name, int(StatusKarty.NEW))).fetchall()
+        historia = self.conn.execute("SELECT ts, ocena, status, interval_przed FROM reviews WHERE deck = ? ORDER BY rowid", (deck_name,)).fetchall()
+        return analizuj_talie(*(list(zip(*karty)) or ((), (), ())), tuple(zip(*historia)) or ((), (), (), ()))
+    @synchronizowane
+    def save_progress(self, deck_name, karty): self.conn.commit()
+    @synchronizowane
+    def reset_progress(self, deck_name):
+        with self.conn:
+            self.conn.execute("UPDATE cards SET status = ?, due = ?, interval = 0, ease = 0, stability = 0, difficulty = 0 WHERE deck = ?", (int(StatusKarty.NEW), time.time(), deck_name))
+            self.conn.execute("DELETE FROM reviews WHERE deck = ?", (deck_name,))
+    @synchronizowane
+    def close(self): self.conn.close()
+
+MAGAZYNY = ('files', 'binary', 'sqlite')
+
+def utworz_magazyn(nazwa): return SQLiteStorage() if nazwa == 'sqlite' else FileStorage(binarny=nazwa == 'binary')
+
+def pytania_zrodla(plik, format='tsv', kolumna=0):
+    # Generator pytań z pliku tekstowego: jeden wiersz (rekord CSV) naraz. 'tsv' obejmuje też zwykły tekst
+    # i eksport Anki (pole przód<TAB>tył, nagłówki '#separator:tab'); wieloliniowe pola CSV są sklejane spacją.
+    rekordy = csv.reader(plik) if format == 'csv' else (linia.rstrip('\r\n').split('\t') for linia in plik)
+    for pola in rekordy:
+        if not pola or (pola[0].startswith('#') and ':' in pola[0]): continue
+        if kolumna < len(pola): yield ' '.join(pola[kolumna].splitlines()).strip()
+
+def importuj_strumieniowo(storage, deck_name, zrodlo, format=None, kolumna=0, postep=None, partia=IMPORT_PARTIA):
+    # Import w stałej pamięci: źródło (ścieżka albo plik binarny) czytane wierszami, duplikaty - również względem talii -
+    # odsiewane po 8-bajtowych skrótach, nowe pytania dopisywane partiami. postep(bajty, rozmiar, dodane, pominiete) po każdej partii.
+    format = format or ('csv' if isinstance(zrodlo, str) and zrodlo.lower().endswith('.csv') else 'tsv')
+    if deck_name not in storage.list_decks(): storage.create_deck(deck_name)
+    znane = {skrot_pytania(pytanie) for pytanie in storage.iter_questions(deck_name)}
+    surowy = open(zrodlo, 'rb') if isinstance(zrodlo, str) else zrodlo
+    try: rozmiar = os.fstat(surowy.fileno()).st_size
+    except (OSError, io.UnsupportedOperation): rozmiar = 0
+    dodane = pominiete = wiersze = 0; bufor = []
+    def zapisz_partie():
+        nonlocal dodane, bufor
+        if bufor: storage.append_questions(deck_name, bufor); dodane += len(bufor); bufor = []
+        if postep:
+            try: pozycja = surowy.tell()
+            except (OSError, io.UnsupportedOperation): pozycja = 0
+            postep(pozycja, rozmiar, dodane, pominiete)
+    with io.TextIOWrapper(surowy, encoding='utf-8-sig', errors='replace', newline='') as plik:
+        for pytanie in pytania_zrodla(plik, format, kolumna):
+            wiersze += 1
+            if pytanie:
+                skrot = skrot_pytania(pytanie)
+                if skrot in znane: pominiete += 1
+                else: znane.add(skrot); bufor.append(pytanie)
+            if wiersze % partia == 0: zapisz_partie()
+        zapisz_partie()
+    return {'dodane': dodane, 'pominiete': pominiete, 'wiersze': wiersze}
+
+def _opis_karty(karta):
+    return {"id": karta.id, "pytanie": karta.pytanie, "status": karta.status.tekst, "due": datetime.fromtimestamp(karta.due).isoformat(timespec='seconds'), "interval": karta.interval}
+
+def _wypisz(args, wiersze, kolumny):
+    if args.json: print(json.dumps(wiersze, ensure_ascii=False, indent=2)); return
+    for w in wiersze: print('\t'.join(str(w[k]) for k in kolumny))
+
+def cmd_decks(storage, args): _wypisz(args, [{"deck": d} for d in sorted(storage.list_decks())], ('deck',))
+
+def cmd_due(storage, args):
+    harmonogram = Harmonogram(storage.load_session_cards(args.deck), limit_nowych=args.new_limit, odstep_nowych=args.new_spacing)
+    kolejka = []
+    while (args.limit is None or len(kolejka) < args.limit) and (karta := harmonogram.nastepna()) is not None: kolejka.append(_opis_karty(karta))
+    _wypisz(args, kolejka, ('id', 'status', 'due', 'pytanie'))
+
+def cmd_review(storage, args):
+    karty = storage.load_cards(args.deck)
+    karta = next((k for k in karty if (k.id == args.id if args.id else k.pytanie == args.question)), None)
+    if karta is None: print(f"Nie znaleziono karty w talii '{args.deck}'.", file=sys.stderr); return 1
+    przed = (karta.status, karta.interval); now = time.time(); zastosuj_ocene(karta, args.grade, now, utworz_planiste(args.scheduler, args.retention))
+    storage.record_history(args.deck, wpis_historii(args.grade, przed, karta, now))
+    if storage.record_review(args.deck, karta): storage.save_progress(args.deck, karty)
+    _wypisz(args, [_opis_karty(karta)], ('id', 'status', 'due', 'pytanie'))
+
+def cmd_summary(storage, args):
+    przeglad = storage.overview(args.decks or sorted(storage.list_decks()))
+    _wypisz(args, [dict(deck=deck, **summary) for deck, summary in przeglad.items()], ('deck', 'new', 'learning', 'young', 'mature', 'due_today'))
+
+def cmd_import(storage, args):
+    # Strumieniowy import CSV/TSV/tekstu ('-' = stdin) z pominięciem duplikatów; postęp istniejących pytań zostaje zachowany.
+    if args.replace and args.deck in storage.list_decks(): storage.save_questions(args.deck, [])
+    def postep(bajty, rozmiar, dodane, pominiete):
+        procent = f"{bajty * 100 // rozmiar}%" if rozmiar else f"{bajty} B"
+        print(f"\r{args.deck}: {procent}, dodano {dodane}, pominięto {pominiete}", end='', file=sys.stderr, flush=True)
+    wynik = importuj_strumieniowo(storage, args.deck, sys.stdin.buffer if args.file == '-' else args.file, args.format, args.column, postep)
+    print(file=sys.stderr); print(f"{args.deck}: dodano {wynik['dodane']}, pominięto {wynik['pominiete']} duplikatów ({wynik['wiersze']} wierszy).")
+
+def cmd_reschedule(storage, args):
+    planista = utworz_planiste(args.scheduler, args.retention)
+    for deck in (args.decks or sorted(storage.list_decks())): print(f"{deck}: przeliczono {storage.reschedule(deck, planista)} kart ({planista.nazwa})")
+
+def cmd_maintain(storage, args):
+    # Nocne porządki: kompaktuje dziennik każdej talii do snapshotu (FileStorage) / zatwierdza zmiany (SQLite).
+    for deck in (args.decks or sorted(storage.list_decks())):
+        karty = storage.load_cards(deck); storage.save_progress(deck, karty); print(f"{deck}: {len(karty)} kart")
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(prog='silnik.py', description="mojaNauka - operacje na taliach bez uruchamiania GUI.")
+    parser.add_argument('--backend', choices=MAGAZYNY, default='files', help="magazyn danych (jak 'storage_backend' w ustawieniach)")
+    parser.add_argument('--dir', default='.', help="katalog z danymi aplikacji (decks/, progress_*.json, mojanauka.db)")
+    parser.add_argument('--json', action='store_true', help="wynik w formacie JSON")
+    parser.add_argument('--scheduler', choices=tuple(PLANISTY), default='classic', help="algorytm powtórek (jak 'scheduler' w ustawieniach)")
+    parser.add_argument('--retention', type=float, default=RETENCJA_DOCELOWA, help="docelowa retencja dla FSRS (0-1)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('decks', help="lista talii").set_defaults(func=cmd_decks)
+    p = sub.add_parser('due', help="kolejka kart do nauki w kolejności sesji"); p.add_argument('deck'); p.set_defaults(func=cmd_due)
+    p.add_argument('--limit', type=int); p.add_argument('--new-limit', type=int); p.add_argument('--new-spacing', type=int, default=3)
+    p = sub.add_parser('review', help="zapisuje ocenę jednej karty"); p.add_argument('deck'); p.set_defaults(func=cmd_review)
+    p.add_argument('--grade', choices=OCENY, required=True)
+    kto = p.add_mutually_exclusive_group(required=True); kto.add_argument('--id'); kto.add_argument('--question')
+    p = sub.add_parser('summary', help="podsumowanie talii (domyślnie wszystkich)"); p.add_argument('decks', nargs='*'); p.set_defaults(func=cmd_summary)
+    p = sub.add_parser('import', help="dopisuje pytania z pliku CSV/TSV/tekstowego, bez duplikatów"); p.add_argument('deck'); p.add_argument('file'); p.set_defaults(func=cmd_import)
+    p.add_argument('--format', choices=('csv', 'tsv')); p.add_argument('--column', type=int, default=0, help="numer kolumny z pytaniem (od 0)")
+    p.add_argument('--replace', action='store_true', help="wyczyść talię przed importem")
+    p = sub.add_parser('reschedule', help="przelicza terminy kart w powtórkach wybranym algorytmem (domyślnie wszystkie talie)"); p.add_argument('decks', nargs='*'); p.set_defaults(func=cmd_reschedule)
+    p = sub.add_parser('maintain', help="kompaktuje postęp talii (domyślnie wszystkich)"); p.add_argument('decks', nargs='*'); p.set_defaults(func=cmd_maintain)
+    args = parser.parse_args(argv)
+    os.chdir(args.dir); os.makedirs(FOLDER_PRZEDMIOTOW, exist_ok=True)
+    storage = utworz_magazyn(args.backend)
+    try:
+        if migruj_stary_postep(storage): print(f"Przeniesiono {PLIK_STAREGO_POSTEPU} do talii (oryginał: {PLIK_STAREGO_POSTEPU}.bak)", file=sys.stderr)
+        return args.func(storage, args) or 0
+    finally: storage.close()
+
+if __name__ == "__main__":
+    sys.exit(cli())